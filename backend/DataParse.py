@@ -2,6 +2,8 @@
 ## Reads the csv files and returns them as dataframes.
 
 import os
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
 import pandas as pd
 import numpy as np
 from sklearn.model_selection import train_test_split
@@ -13,11 +15,98 @@ _CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
 # Go one level up to the project root, then into the data folder
 DATA_DIR = os.path.join(_CURRENT_DIR, '..', 'Data_SIH_2025')
 
+# Parsed copies of the CSVs used by the fast loader, keyed by file content hash
+CACHE_DIR = os.path.join(_CURRENT_DIR, '.cache', 'parsed')
+# Bump when the typed schema changes so stale cache files are ignored
+_PARSED_SCHEMA_VERSION = 1
+
+# Calendar columns fit in small ints; everything else is read as float32
+TIME_DTYPES = {'year': np.int16, 'month': np.int8, 'day': np.int8, 'hour': np.int8}
+
+
+def _csv_engine(engine):
+    """Resolves engine="auto" to the multithreaded pyarrow parser when it is installed."""
+    if engine != "auto":
+        return engine
+    try:
+        import pyarrow  # noqa: F401
+        return "pyarrow"
+    except ImportError:
+        return "c"
+
+
+def _file_hash(path):
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _parse_typed_csv(path, engine):
+    # Read the header ourselves so the schema can use the stripped column names
+    with open(path, 'r') as f:
+        columns = [c.strip() for c in f.readline().split(',')]
+    try:
+        df = pd.read_csv(path, header=0, names=columns, engine=engine,
+                         dtype={c: np.float32 for c in columns})
+    except ValueError:
+        # Non-numeric cells somewhere: coerce them to NaN like create_timestamp_index does
+        df = pd.read_csv(path, header=0, names=columns, engine=engine)
+        df = df.apply(pd.to_numeric, errors='coerce').astype(np.float32)
+
+    # Time columns are written as "2022.00"; store them as small ints when they are complete
+    for col, dtype in TIME_DTYPES.items():
+        if col in df.columns and not df[col].isna().any():
+            df[col] = df[col].astype(dtype)
+    return df
+
+
+def read_site_csv(path, engine="auto", use_cache=True, cache_dir=CACHE_DIR):
+    """
+    Reads one site CSV with an explicit schema (float32 values, small-int time columns).
+    With use_cache=True the parsed frame is stored under `cache_dir`, keyed by the file's
+    content hash, and reused until the file changes.
+    """
+    cache_path = None
+    if use_cache:
+        name = os.path.splitext(os.path.basename(path))[0]
+        cache_path = os.path.join(cache_dir, f"{name}-v{_PARSED_SCHEMA_VERSION}-{_file_hash(path)}.pkl")
+        if os.path.exists(cache_path):
+            return pd.read_pickle(cache_path)
+
+    df = _parse_typed_csv(path, _csv_engine(engine))
+
+    if cache_path is not None:
+        os.makedirs(cache_dir, exist_ok=True)
+        # Drop parsed copies of older versions of this file
+        for old in os.listdir(cache_dir):
+            if old.startswith(f"{name}-") and old != os.path.basename(cache_path):
+                try:
+                    os.remove(os.path.join(cache_dir, old))
+                except FileNotFoundError:
+                    pass
+        tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+        df.to_pickle(tmp_path)
+        os.replace(tmp_path, cache_path)
+    return df
+
+
 # === FUNCTION TO LOAD ALL SITE DATA ===
-def load_site_data(site_no):
+def load_site_data(site_no, fast=False, engine="auto", use_cache=True):
+    """
+    Loads a site's train and unseen CSVs.
+    fast=True uses the typed reader (see read_site_csv) and parses both files concurrently.
+    """
     train_path = os.path.join(DATA_DIR, f"site_{site_no}_train_data.csv")
     unseen_path = os.path.join(DATA_DIR, f"site_{site_no}_unseen_input_data.csv")
 
+    if fast:
+        with ThreadPoolExecutor(max_workers=2) as pool:
+            train_future = pool.submit(read_site_csv, train_path, engine, use_cache)
+            unseen_future = pool.submit(read_site_csv, unseen_path, engine, use_cache)
+            return train_future.result(), unseen_future.result()
+
     train_df = pd.read_csv(train_path)
     unseen_df = pd.read_csv(unseen_path)
 
@@ -28,16 +117,37 @@ def load_site_data(site_no):
     return train_df, unseen_df
 
 
+# === FEATURE / TARGET COLUMNS ===
+FEATURES = ['year', 'month', 'day', 'hour',
+            'O3_forecast', 'NO2_forecast', 'T_forecast', 'q_forecast',
+            'u_forecast', 'v_forecast', 'w_forecast',
+            'NO2_satellite', 'HCHO_satellite', 'ratio_satellite']
+
+TARGETS = ['O3_target', 'NO2_target']
+
+# Features whose gaps are filled with the column mean
+SATELLITE_COLS = ['NO2_satellite', 'HCHO_satellite', 'ratio_satellite']
+# Rows per block when preprocess_compact fits the scaler
+_SCALER_BLOCK_ROWS = 32768
+
+
+def available_features(df):
+    """Returns the model feature columns present in a dataframe, in training order."""
+    return [f for f in FEATURES if f in df.columns]
+
+
 # === PREPROCESS FUNCTION ===
 def create_timestamp_index(df):
     """Creates a datetime index from time-related columns."""
     # Ensure columns are numeric
     time_cols = ['year', 'month', 'day', 'hour']
     for col in time_cols:
-        df[col] = pd.to_numeric(df[col], errors='coerce')
+        if not pd.api.types.is_numeric_dtype(df[col]):
+            df[col] = pd.to_numeric(df[col], errors='coerce')
     
     # Drop rows with invalid time data
-    df.dropna(subset=time_cols, inplace=True)
+    if df[time_cols].isna().any().any():
+        df.dropna(subset=time_cols, inplace=True)
     
     # Create the timestamp index
     df['timestamp'] = pd.to_datetime(df[time_cols])
@@ -46,28 +156,29 @@ def create_timestamp_index(df):
 
 
 # === PREPROCESS FUNCTION ===
-def preprocess_data(df, scaler=None):
+def preprocess_data(df, scaler=None, compact=False):
     """
     Preprocesses the data: fills missing values, separates features and targets,
     and scales the features. It also removes rows where target values are missing.
+    compact=True uses the low-memory float32 path (see preprocess_compact).
     """
+    if compact:
+        return preprocess_compact(df, scaler=scaler)
+
     # 1. Handle missing satellite values in features
-    satellite_cols = ['NO2_satellite', 'HCHO_satellite', 'ratio_satellite']
+    satellite_cols = SATELLITE_COLS
+    fill_values = {}
     for col in satellite_cols:
         if col in df.columns:
             # Use the mean of the column to fill missing values
-            df[col] = df[col].fillna(df[col].mean())
+            fill_values[col] = df[col].mean()
+            df[col] = df[col].fillna(fill_values[col])
 
-    # 2. Define feature & target columns
-    features = ['year', 'month', 'day', 'hour',
-                'O3_forecast', 'NO2_forecast', 'T_forecast', 'q_forecast',
-                'u_forecast', 'v_forecast', 'w_forecast',
-                'NO2_satellite', 'HCHO_satellite', 'ratio_satellite']
-    
-    targets = ['O3_target', 'NO2_target']
+    # 2. Feature & target columns (see FEATURES / TARGETS)
+    targets = TARGETS
     
     # Filter out features that are not in the dataframe columns
-    available_features = [f for f in features if f in df.columns]
+    feature_cols = available_features(df)
     
     # 3. Handle targets and remove rows with missing labels
     y = None
@@ -76,13 +187,15 @@ def preprocess_data(df, scaler=None):
         df.dropna(subset=targets, inplace=True)
         y = df[targets]
 
-    X = df[available_features]
+    X = df[feature_cols]
 
     # 4. Normalize features
     if scaler is None:
         # This is training mode: fit and transform
         scaler = StandardScaler()
         X_scaled = scaler.fit_transform(X)
+        # The fill values used here, for filling gaps the same way at inference (see model_registry)
+        scaler.fill_values_ = _fill_value_dict(fill_values)
         return X_scaled, y, scaler
     else:
         # This is prediction mode: only transform
@@ -90,6 +203,84 @@ def preprocess_data(df, scaler=None):
         return X_scaled, scaler # Always return 2 values in this branch
 
 
+def preprocess_compact(df, scaler=None):
+    """
+    Low-memory version of preprocess_data with the same return values.
+
+    The features are copied column by column straight into one C-contiguous float32
+    matrix (the layout xgboost uses internally) and scaled in place, so no feature
+    DataFrame or float64 matrix is ever built. `df` is not modified and can keep its
+    timestamp index; y is a float32 frame of the labelled rows.
+    `df` can also be a list of frames (e.g. a site's train and unseen data): their rows
+    are filled into the matrix one after another, as if the frames had been concatenated.
+    """
+    parts = [df] if isinstance(df, pd.DataFrame) else list(df)
+    columns = set().union(*(part.columns for part in parts))
+    feature_cols = [f for f in FEATURES if f in columns]
+
+    labelled = None
+    if all(col in columns for col in TARGETS):
+        # A part without the target columns has no labelled rows, as after a concat
+        labelled = [part[TARGETS].notna().all(axis=1).to_numpy() if all(col in part.columns for col in TARGETS)
+                    else np.zeros(len(part), dtype=bool) for part in parts]
+
+    n_rows = sum(len(part) for part in parts) if labelled is None else int(sum(mask.sum() for mask in labelled))
+    X = np.empty((n_rows, len(feature_cols)), dtype=np.float32)
+    fill_values = {}
+    for j, col in enumerate(feature_cols):
+        row = 0
+        for i, part in enumerate(parts):
+            n = len(part) if labelled is None else int(labelled[i].sum())
+            if col not in part.columns:
+                X[row:row + n, j] = np.nan
+            else:
+                values = part[col].to_numpy()
+                X[row:row + n, j] = values if labelled is None else values[labelled[i]]
+            row += n
+        if col in SATELLITE_COLS:
+            # Same fill value as preprocess_data: the mean over all rows, labelled or not
+            missing = np.isnan(X[:, j])
+            if missing.any() or scaler is None:
+                fill_values[col] = _column_mean(parts, col)
+                X[missing, j] = fill_values[col]
+
+    y = None
+    if labelled is not None:
+        y_parts = [part.loc[mask, TARGETS] for part, mask in zip(parts, labelled) if mask.any()]
+        y = pd.concat(y_parts).astype(np.float32) if y_parts else pd.DataFrame(columns=TARGETS, dtype=np.float32)
+
+    if scaler is None:
+        # partial_fit over row blocks: a single fit() makes float64 temporaries the size of X
+        scaler = StandardScaler()
+        for start in range(0, max(n_rows, 1), _SCALER_BLOCK_ROWS):
+            scaler.partial_fit(X[start:start + _SCALER_BLOCK_ROWS])
+        # Record the column names so the scaler still accepts DataFrames (model_registry, the API)
+        scaler.feature_names_in_ = np.array(feature_cols, dtype=object)
+        scaler.fill_values_ = _fill_value_dict(fill_values)
+        return _scale_in_place(X, scaler), y, scaler
+    return _scale_in_place(X, scaler), scaler
+
+
+def _fill_value_dict(fill_values):
+    """Satellite fill values as plain floats; a column that was entirely NaN has none."""
+    return {col: float(value) for col, value in fill_values.items() if pd.notna(value)}
+
+
+def _column_mean(parts, col):
+    """Mean of one column over several frames, the same value as on their concatenation."""
+    if len(parts) == 1:
+        return parts[0][col].mean()
+    # Only this column is joined, not the whole frames
+    return pd.concat([part[col] for part in parts if col in part.columns], ignore_index=True).mean()
+
+
+def _scale_in_place(X, scaler):
+    """Applies a fitted StandardScaler to a float32 matrix without allocating a new one."""
+    X -= scaler.mean_.astype(X.dtype)
+    X /= scaler.scale_.astype(X.dtype)
+    return X
+
+
 # === EXAMPLE: LOAD SITE 1 DATA ===
 if __name__ == "__main__":
     site_no = 1
@@ -1,18 +1,30 @@
-from fastapi import FastAPI, HTTPException, BackgroundTasks
+from fastapi import FastAPI, HTTPException, BackgroundTasks, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
+from fastapi.responses import StreamingResponse, JSONResponse
 from pydantic import BaseModel
 from typing import Optional, List, Dict
 import pandas as pd
-import json
 import numpy as np
-import httpx
 from datetime import datetime
 import asyncio
+from bisect import bisect_left
 from pathlib import Path
 import os
 
+from forecast_cache import (ForecastCache, POLLUTANTS, RESPONSE_FORMATS, pollutant_columns, iter_csv_chunks,
+                            dumps_json, frame_to_columnar, frame_to_records)
+from downsample import RESOLUTIONS, AGGREGATIONS, MIN_POINTS, shape_forecast
+from metrics_index import MetricsIndex
+from http_cache import BodyCache, make_etag, cached_json_response
+import model_registry
+from forecast_batcher import ForecastBatcher
+from feedback_store import FeedbackStore, FeedbackCounters, FEELINGS
+from feedback_db import FeedbackDB, FeedbackWriter
+from aqi_client import AQIClient, OWM_AIR_POLLUTION_URL
+from aqi_refresher import AQIRefresher, load_site_coordinates
+from main import generate_future_features
+
 # Get the absolute path of the directory where this script is located
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 
@@ -27,8 +39,69 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# In-memory storage for feedback (use SQLite/MongoDB in production)
-feedback_store = []
+# Feedback is stored durably in SQLite; submissions are group-committed by one writer task
+FEEDBACK_DB_PATH = os.environ.get("FEEDBACK_DB_PATH", os.path.join(BASE_DIR, "feedback.db"))
+feedback_db = FeedbackDB(FEEDBACK_DB_PATH)
+feedback_writer = FeedbackWriter(feedback_db)
+
+# In-memory index of the stored feedback by site and time, kept in sync with the database
+feedback_store = FeedbackStore()
+# Rolling per-site, per-feeling counts behind /api/feedback/summary
+feedback_counters = FeedbackCounters()
+
+# data_version of the feedback database at the last sync, and the lock that keeps syncs one at a time
+feedback_synced_version = None
+feedback_sync_lock = asyncio.Lock()
+
+async def sync_feedback_store():
+    """
+    Adds rows committed since the last sync, including ones written by other API workers.
+    Only queries the table when the database's data_version has changed, and then off the event loop.
+    """
+    global feedback_synced_version
+    async with feedback_sync_lock:
+        version = feedback_db.data_version()
+        if version == feedback_synced_version:
+            return
+        entries = await asyncio.get_running_loop().run_in_executor(
+            None, feedback_db.rows_after, feedback_store.last_id
+        )
+        for entry in entries:
+            feedback_store.add(entry)
+            feedback_counters.add(entry)
+        # Rows committed after the version was read are picked up by the next sync
+        feedback_synced_version = version
+
+# Parsed prediction files, reloaded only when main.py rewrites them
+forecast_cache = ForecastCache(os.path.join(BASE_DIR, "predictions"))
+
+# Metrics and rubric scores for every site, rebuilt when a metrics file changes
+metrics_index = MetricsIndex(os.path.join(BASE_DIR, "metrics"))
+
+# Serialized (and pre-compressed) bodies of the forecast/metrics responses, keyed by file version
+body_cache = BodyCache()
+
+# Trained models per site, loaded once at startup (see model_registry)
+SITE_IDS = list(range(1, 8))
+model_store = {}
+
+def _predict_site(site_id, features_df):
+    return model_store[site_id].predict(features_df)
+
+# Concurrent /api/forecast calls are coalesced into one predict call per site
+forecast_batcher = ForecastBatcher(_predict_site)
+
+# Real-time AQI from OpenWeatherMap, through one pooled, cached client
+# You'll need to sign up at openweathermap.org and get an API key
+OWM_API_KEY = os.environ.get("OWM_API_KEY", "YOUR_OPENWEATHERMAP_API_KEY")
+# Point at a local stub (see benchmarks/fake_owm.py) for tests and load runs
+OWM_URL = os.environ.get("OWM_URL", OWM_AIR_POLLUTION_URL)
+# Readings stay cached longer than the background refresh interval, so site lookups never miss
+AQI_REFRESH_INTERVAL = 600
+aqi_client = AQIClient(OWM_API_KEY, url=OWM_URL, ttl=AQI_REFRESH_INTERVAL * 1.5)
+
+# Largest number of profiles accepted by /api/health-recommendations/batch
+MAX_HEALTH_BATCH = 50000
 
 # ============================================================================
 # MODELS
@@ -40,6 +113,14 @@ class FeedbackCreate(BaseModel):
     description: Optional[str] = None
     timestamp: Optional[str] = None
 
+class ForecastRequest(BaseModel):
+    site: int
+    # Either explicit feature rows (column -> value) ...
+    rows: Optional[List[Dict[str, Optional[float]]]] = None
+    # ... or a forecast window synthesized from the site's last known data
+    start: Optional[datetime] = None
+    hours: int = 24
+
 class UserProfile(BaseModel):
     age_group: str
     conditions: List[str] = []
@@ -48,52 +129,20 @@ class HealthRequest(BaseModel):
     aqi: int
     profile: UserProfile
 
+class HealthBatchRequest(BaseModel):
+    items: List[HealthRequest]
+    # Return each distinct recommendation once, referenced by key from the items
+    compact: bool = False
+
 # ============================================================================
 # HELPER FUNCTIONS
 # ============================================================================
 
-def normalize_metric(value, good_thresh, bad_thresh, higher_is_better=False):
-    """Normalizes a metric's value to a score between 0.0 and 1.0."""
-    if higher_is_better:
-        if value >= good_thresh: return 1.0
-        if value <= bad_thresh: return 0.0
-        return (value - bad_thresh) / (good_thresh - bad_thresh)
-    else:
-        if value <= good_thresh: return 1.0
-        if value >= bad_thresh: return 0.0
-        return (bad_thresh - value) / (bad_thresh - good_thresh)
-
-def calculate_combined_score(metrics_dict):
-    """Calculates a single combined score from metrics."""
-    if not metrics_dict:
-        return 0.0, {}
-
-    rubric = {
-        "RMSE": {"good": 12, "bad": 20, "higher_is_better": False},
-        "MAE":  {"good": 9,  "bad": 16, "higher_is_better": False},
-        "Bias": {"good": 1,  "bad": 5,  "higher_is_better": False},
-        "R2":   {"good": 0.8,"bad": 0.5,"higher_is_better": True},
-        "RIA":  {"good": 0.8,"bad": 0.5,"higher_is_better": True},
-    }
+SENSITIVE_AGE_GROUPS = {"child", "elderly"}
+SENSITIVE_CONDITIONS = {"asthma", "heart_disease", "respiratory"}
 
-    normalized_scores = {}
-    
-    for metric, params in rubric.items():
-        if metric in metrics_dict and metrics_dict[metric] is not None:
-            value = abs(metrics_dict[metric]) if metric == "Bias" else metrics_dict[metric]
-            score = normalize_metric(
-                value,
-                params["good"],
-                params["bad"],
-                params["higher_is_better"]
-            )
-            normalized_scores[metric] = score
-
-    if not normalized_scores:
-        return 0.0, {}
-        
-    final_score = np.mean(list(normalized_scores.values()))
-    return final_score, normalized_scores
+def is_sensitive_profile(age_group: str, conditions: List[str]) -> bool:
+    return age_group in SENSITIVE_AGE_GROUPS or any(c in SENSITIVE_CONDITIONS for c in conditions)
 
 def get_health_recommendation(aqi: int, user_profile: UserProfile) -> Dict:
     """Generate personalized health recommendations based on AQI and user profile."""
@@ -107,8 +156,7 @@ def get_health_recommendation(aqi: int, user_profile: UserProfile) -> Dict:
         "outdoor_advice_key": ""
     }
     
-    is_sensitive = user_profile.age_group in ["child", "elderly"] or \
-                   any(c in ["asthma", "heart_disease", "respiratory"] for c in user_profile.conditions)
+    is_sensitive = is_sensitive_profile(user_profile.age_group, user_profile.conditions)
     
     if aqi <= 50:  # Good
         recommendations["severity"] = "good"
@@ -206,6 +254,24 @@ def get_health_recommendation(aqi: int, user_profile: UserProfile) -> Dict:
     
     return recommendations
 
+# The recommendations only depend on the AQI band and on whether the profile is sensitive,
+# so every combination is built once here and requests become a table lookup.
+AQI_BAND_LIMITS = [50, 100, 150, 200, 300]
+HEALTH_TABLE = {
+    (band, sensitive): get_health_recommendation(
+        limit, UserProfile(age_group="elderly" if sensitive else "adult")
+    )
+    for band, limit in enumerate(AQI_BAND_LIMITS + [AQI_BAND_LIMITS[-1] + 1])
+    for sensitive in (False, True)
+}
+
+def health_table_key(aqi: int, user_profile: UserProfile):
+    return bisect_left(AQI_BAND_LIMITS, aqi), is_sensitive_profile(user_profile.age_group, user_profile.conditions)
+
+def lookup_health_recommendation(aqi: int, user_profile: UserProfile) -> Dict:
+    """Same result as get_health_recommendation, from HEALTH_TABLE. The returned dict is shared: do not modify it."""
+    return HEALTH_TABLE[health_table_key(aqi, user_profile)]
+
 # ============================================================================
 # API ROUTES
 # ============================================================================
@@ -220,154 +286,289 @@ async def get_sites():
     return {"sites": [1, 2, 3, 4, 5, 6, 7]}
 
 @app.get("/api/data/site/{site_id}")
-async def get_site_data(site_id: int, horizon: int = 24):
-    """Get prediction data for a specific site."""
+async def get_site_data(request: Request, site_id: int, horizon: int = 24, format: str = "records",
+                        start: Optional[datetime] = None, end: Optional[datetime] = None,
+                        offset: int = 0, limit: Optional[int] = None,
+                        resolution: Optional[str] = None, agg: str = "mean",
+                        points: Optional[int] = None, pollutant: str = "O3"):
+    """
+    Get prediction data for a specific site.
+    format=columnar returns one array per column and epoch-second timestamps instead of row records.
+    start/end (site-local, end exclusive) and offset/limit page through the forecast instead of
+    taking the first `horizon` rows; `limit` defaults to `horizon`.
+    For charts, resolution=hourly|3h|daily aggregates the rows (agg=mean|max) and points=N
+    downsamples them with LTTB on `pollutant`'s prediction, keeping the payload bounded.
+    Responses carry an ETag/Last-Modified of the prediction file; repeat polls get a 304.
+    """
     if site_id not in range(1, 8):
         raise HTTPException(status_code=404, detail="Site not found")
-    
-    pred_file = os.path.join(BASE_DIR, "predictions", f"predictions_site_{site_id}.csv")
+
+    if format not in RESPONSE_FORMATS:
+        raise HTTPException(status_code=400, detail=f"format must be one of: {', '.join(RESPONSE_FORMATS)}")
+
+    ranged = start is not None or end is not None or offset != 0 or limit is not None
+    if ranged:
+        if any(t is not None and t.tzinfo is not None for t in (start, end)):
+            raise HTTPException(status_code=400, detail="start and end are site-local times without a timezone")
+        if offset < 0:
+            raise HTTPException(status_code=400, detail="offset must be >= 0")
+        if limit is None:
+            limit = horizon
+        if limit < 1:
+            raise HTTPException(status_code=400, detail="limit must be >= 1")
+
+    shaped = resolution is not None or points is not None
+    if resolution is not None and resolution not in RESOLUTIONS:
+        raise HTTPException(status_code=400, detail=f"resolution must be one of: {', '.join(RESOLUTIONS)}")
+    if agg not in AGGREGATIONS:
+        raise HTTPException(status_code=400, detail=f"agg must be one of: {', '.join(AGGREGATIONS)}")
+    if points is not None and points < MIN_POINTS:
+        raise HTTPException(status_code=400, detail=f"points must be >= {MIN_POINTS}")
+    if pollutant not in POLLUTANTS:
+        raise HTTPException(status_code=400, detail=f"pollutant must be one of: {', '.join(POLLUTANTS)}")
     
     try:
-        df = pd.read_csv(pred_file)
-        df['timestamp'] = pd.to_datetime(df[['year', 'month', 'day', 'hour']])
-        df = df.sort_values('timestamp').reset_index(drop=True)
-        df = df.rename(columns={
-            "O3_predicted": "O3_pred", 
-            "NO2_predicted": "NO2_pred",
-            "O3_target": "O3_true",
-            "NO2_target": "NO2_true"
-        })
-        
-        # Limit to forecast horizon
-        df = df.head(horizon)
-        
-        # Replace NaN with None for JSON compatibility
-        df = df.replace({np.nan: None})
-
-        # Convert to JSON-friendly format
-        df['timestamp'] = df['timestamp'].dt.strftime('%Y-%m-%d %H:%M:%S')
-        
-        return {
-            "site": site_id,
-            "horizon": horizon,
-            "data": df.to_dict(orient='records')
-        }
-    
+        entry = forecast_cache.get(site_id)
     except FileNotFoundError:
         raise HTTPException(
             status_code=404, 
             detail=f"Prediction file not found for site {site_id}"
         )
 
+    if ranged:
+        # Binary search over the cached timestamps; the page is a slice of the cached frame
+        lo, hi = entry.row_range(start, end)
+        total = hi - lo
+        page_lo = min(lo + offset, hi)
+        page_hi = min(page_lo + limit, hi)
+        header = {
+            "site": site_id,
+            "start": start.isoformat(sep=' ') if start is not None else None,
+            "end": end.isoformat(sep=' ') if end is not None else None,
+            "offset": offset,
+            "limit": limit,
+            "total": total,
+            "next_offset": offset + limit if offset + limit < total else None
+        }
+        params = (header["start"], header["end"], offset, limit)
+    else:
+        # Limit to forecast horizon
+        page_lo, page_hi = 0, horizon
+        header = {"site": site_id, "horizon": horizon}
+        params = (horizon,)
+
+    if shaped:
+        header.update({"resolution": resolution, "agg": agg if resolution is not None else None,
+                       "points": points, "pollutant": pollutant if points is not None else None})
+        params += (resolution, header["agg"], points, header["pollutant"])
+
+    def build():
+        if shaped:
+            # Aggregated/downsampled from the cached frame; body_cache keeps the serialized result
+            df = shape_forecast(entry.frame.iloc[page_lo:page_hi], resolution, agg, points, f"{pollutant}_predicted")
+            if format == "columnar":
+                return dumps_json(dict(header, format="columnar", **frame_to_columnar(df)))
+            return dumps_json(dict(header, data=frame_to_records(df)))
+        if format == "columnar":
+            if not ranged:
+                # Serialized once per horizon and cached as bytes
+                return forecast_cache.columnar_json(site_id, horizon)
+            return dumps_json(dict(header, format="columnar", **frame_to_columnar(entry.frame.iloc[page_lo:page_hi])))
+        # Records are served from the parsed-file cache
+        return dumps_json(dict(header, data=forecast_cache.records_slice(site_id, page_lo, page_hi)))
+
+    # entry.signature is (source file, mtime_ns, size)
+    etag = make_etag("site", site_id, params, format, entry.signature)
+    return cached_json_response(request, body_cache, ("site", site_id, params, format),
+                                etag, entry.signature[1], build)
+
+@app.get("/api/data/sites")
+async def get_sites_data(ids: Optional[str] = None, horizon: int = 24):
+    """
+    Get prediction data for several sites in one call (ids=1,2,3; default: every site).
+    A site that cannot be served gets an inline error instead of failing the whole response.
+    """
+    if ids is None:
+        site_ids = SITE_IDS
+    else:
+        try:
+            site_ids = [int(part) for part in ids.split(",") if part.strip()]
+        except ValueError:
+            raise HTTPException(status_code=400, detail="ids must be a comma-separated list of site numbers")
+    # Keep the requested order, without repeats
+    site_ids = list(dict.fromkeys(site_ids))
+
+    sites = []
+    for site_id in site_ids:
+        if site_id not in range(1, 8):
+            sites.append({"site": site_id, "error": {"status": 404, "detail": "Site not found"}})
+            continue
+        try:
+            sites.append({"site": site_id, "horizon": horizon, "data": forecast_cache.records(site_id, horizon)})
+        except FileNotFoundError:
+            sites.append({"site": site_id, "error": {
+                "status": 404, "detail": f"Prediction file not found for site {site_id}"
+            }})
+        except Exception as e:
+            sites.append({"site": site_id, "error": {"status": 500, "detail": str(e)}})
+
+    return {
+        "horizon": horizon,
+        "sites": sites,
+        "errors": sum(1 for entry in sites if "error" in entry)
+    }
+
+@app.get("/api/models")
+async def get_models():
+    """List the model versions loaded for on-demand forecasting."""
+    return {"models": [model_store[site].summary() for site in sorted(model_store)]}
+
+@app.post("/api/forecast")
+async def forecast_on_demand(request: ForecastRequest):
+    """Run the site's trained models on the given feature rows, or on a synthesized forecast window."""
+    site_models = model_store.get(request.site)
+    if site_models is None:
+        raise HTTPException(status_code=404, detail=f"No trained model for site {request.site}")
+
+    timestamps = None
+    if request.rows is not None:
+        if not request.rows:
+            raise HTTPException(status_code=400, detail="rows must not be empty")
+        features_df = pd.DataFrame(request.rows, dtype=float)
+        missing = [f for f in site_models.features if f not in features_df.columns]
+        if missing:
+            raise HTTPException(status_code=400, detail=f"Missing feature columns: {', '.join(missing)}")
+    else:
+        try:
+            features_df = generate_future_features(site_models.template_frame(), request.hours, start=request.start)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        timestamps = pd.to_datetime(features_df[['year', 'month', 'day', 'hour']]).dt.strftime('%Y-%m-%d %H:%M:%S').tolist()
+
+    predictions = await forecast_batcher.submit(request.site, features_df)
+
+    return {
+        "site": request.site,
+        "model_version": site_models.version,
+        "rows": len(features_df),
+        "timestamps": timestamps,
+        "predictions": {
+            target.replace("_target", "_pred"): [float(v) for v in values]
+            for target, values in predictions.items()
+        }
+    }
+
+@app.get("/api/forecast/stats")
+async def get_forecast_stats():
+    """Get micro-batching statistics for /api/forecast."""
+    return forecast_batcher.stats()
+
+@app.get("/api/cache/stats")
+async def get_cache_stats():
+    """Get hit/miss counters for the in-memory forecast cache and the prepared response bodies."""
+    return {"forecast": forecast_cache.stats(), "bodies": body_cache.stats()}
+
 @app.get("/api/metrics/site/{site_id}")
-async def get_site_metrics(site_id: int, pollutant: str = "O3"):
-    """Get model performance metrics for a specific site and pollutant."""
+async def get_site_metrics(request: Request, site_id: int, pollutant: str = "O3"):
+    """Get model performance metrics for a specific site and pollutant (conditional GET, see get_site_data)."""
     if site_id not in range(1, 8):
         raise HTTPException(status_code=404, detail="Site not found")
     
-    metrics_file = os.path.join(BASE_DIR, "metrics", f"metrics_site_{site_id}.json")
+    site_metrics = metrics_index.site(site_id)
+    if site_metrics is None:
+        raise HTTPException(
+            status_code=404, 
+            detail=f"Metrics file not found for site {site_id}"
+        )
     
-    try:
-        with open(metrics_file, 'r') as f:
-            data = json.load(f)
-        
-        pollutant_key = f"{pollutant}_target"
-        
-        if pollutant_key not in data:
-            raise HTTPException(
-                status_code=404, 
-                detail=f"Metrics not found for {pollutant} at site {site_id}"
-            )
-        
-        metrics = data[pollutant_key]
-        combined_score, normalized_scores = calculate_combined_score(metrics)
-        
-        return {
-            "site": site_id,
-            "pollutant": pollutant,
-            "metrics": metrics,
-            "combined_score": combined_score,
-            "normalized_scores": normalized_scores
-        }
+    pollutant_key = f"{pollutant}_target"
     
-    except FileNotFoundError:
+    if pollutant_key not in site_metrics:
         raise HTTPException(
             status_code=404, 
-            detail=f"Metrics file not found for site {site_id}"
+            detail=f"Metrics not found for {pollutant} at site {site_id}"
         )
-
-@app.get("/api/metrics/all")
-async def get_all_metrics():
-    """Get metrics for all sites and pollutants."""
-    all_metrics = []
     
-    for site_id in range(1, 8):
-        try:
-            metrics_file = os.path.join(BASE_DIR, "metrics", f"metrics_site_{site_id}.json")
-            with open(metrics_file, 'r') as f:
-                data = json.load(f)
-            
-            for pollutant, scores in data.items():
-                combined_score, norm_scores = calculate_combined_score(scores)
-                
-                record = {
-                    'site': site_id,
-                    'pollutant': pollutant,
-                    'RMSE': scores.get('RMSE'),
-                    'R2': scores.get('R2'),
-                    'RIA': scores.get('RIA'),
-                    'MAE': scores.get('MAE'),
-                    'Bias': scores.get('Bias'),
-                    'combined_score': combined_score,
-                    'normalized_scores': norm_scores
-                }
-                all_metrics.append(record)
-        except FileNotFoundError:
-            continue
+    entry = site_metrics[pollutant_key]
     
-    return {"metrics": all_metrics}
+    def build():
+        return dumps_json({
+            "site": site_id,
+            "pollutant": pollutant,
+            "metrics": entry["metrics"],
+            "combined_score": entry["combined_score"],
+            "normalized_scores": entry["normalized_scores"]
+        })
+
+    etag = make_etag("metrics", site_id, pollutant, metrics_index.version)
+    return cached_json_response(request, body_cache, ("metrics", site_id, pollutant),
+                                etag, metrics_index.last_modified_ns, build)
+
+@app.get("/api/metrics/all")
+async def get_all_metrics(request: Request):
+    """Get metrics for all sites and pollutants (conditional GET, see get_site_data)."""
+    records = metrics_index.all()
+    etag = make_etag("metrics", "all", metrics_index.version)
+    return cached_json_response(request, body_cache, ("metrics", "all"), etag, metrics_index.last_modified_ns,
+                                lambda: dumps_json({"metrics": records}))
 
 @app.get("/api/aqi/current")
-async def get_current_aqi(lat: float = 28.6139, lon: float = 77.2090):
+async def get_current_aqi(lat: float = 28.6139, lon: float = 77.2090, site: Optional[int] = None):
     """
     Fetch real-time AQI data from external API.
-    Default coordinates are for Delhi, India.
+    Default coordinates are for Delhi, India; `site` uses a monitoring site's coordinates.
     """
-    # Using OpenWeatherMap Air Pollution API (free tier)
-    # You'll need to sign up at openweathermap.org and get an API key
-    API_KEY = "YOUR_OPENWEATHERMAP_API_KEY"  # Replace with your key
-    
+    if site is not None:
+        if site not in aqi_refresher.sites:
+            raise HTTPException(status_code=404, detail=f"Unknown site {site}")
+        lat, lon = aqi_refresher.sites[site].lat, aqi_refresher.sites[site].lon
+
+    # Using OpenWeatherMap Air Pollution API (free tier), cached per ~1 km cell (see AQIClient).
+    # The sites are kept warm by aqi_refresher; an expired reading is served while it is re-fetched.
     try:
-        async with httpx.AsyncClient() as client:
-            response = await client.get(
-                f"http://api.openweathermap.org/data/2.5/air_pollution",
-                params={"lat": lat, "lon": lon, "appid": API_KEY},
-                timeout=10.0
-            )
-            
-            if response.status_code == 200:
-                data = response.json()
-                aqi_data = data['list'][0]
-                
-                # OpenWeatherMap uses 1-5 scale, convert to US EPA scale (0-500)
-                aqi_map = {1: 25, 2: 75, 3: 125, 4: 175, 5: 275}
-                aqi = aqi_map.get(aqi_data['main']['aqi'], 100)
-                
-                return {
-                    "aqi": aqi,
-                    "timestamp": datetime.utcnow().isoformat(),
-                    "location": {"lat": lat, "lon": lon},
-                    "components": aqi_data['components'],
-                    "category": get_aqi_category(aqi)
-                }
-            else:
-                # Fallback to mock data if API fails
-                return get_mock_aqi_data()
-    
+        result = await aqi_client.get(lat, lon, allow_stale=True)
     except Exception as e:
         # Return mock data on error
         return get_mock_aqi_data()
 
+    return aqi_response(result, lat, lon)
+
+def aqi_response(result, lat, lon):
+    """Builds the /api/aqi/current payload from an AQIClient result."""
+    aqi_data = result["reading"]
+    
+    # OpenWeatherMap uses 1-5 scale, convert to US EPA scale (0-500)
+    aqi_map = {1: 25, 2: 75, 3: 125, 4: 175, 5: 275}
+    aqi = aqi_map.get(aqi_data['main']['aqi'], 100)
+    
+    return {
+        "aqi": aqi,
+        "timestamp": result["fetched_at"],
+        "location": {"lat": lat, "lon": lon},
+        "components": aqi_data['components'],
+        "category": get_aqi_category(aqi),
+        "cached": result["cached"],
+        "stale": result["stale"]
+    }
+
+@app.get("/api/aqi/sites")
+async def get_sites_aqi():
+    """Latest cached AQI of every monitoring site, with how old each reading is. Never calls upstream."""
+    staleness = aqi_refresher.staleness()
+    sites = []
+    for site_id, state in staleness.items():
+        cached = aqi_client.cached(state["lat"], state["lon"])
+        reading = None
+        if cached is not None:
+            reading = aqi_response(dict(cached, cached=True, stale=state["stale"]), state["lat"], state["lon"])
+        sites.append({"site": site_id, "aqi": reading, "refresh": state})
+    return {"sites": sites}
+
+@app.get("/api/aqi/stats")
+async def get_aqi_stats():
+    """Cache and upstream call statistics of the real-time AQI client."""
+    return {"client": aqi_client.stats(), "refresher": aqi_refresher.staleness()}
+
 def get_mock_aqi_data():
     """Return mock AQI data for testing."""
     mock_aqi = np.random.randint(50, 200)
@@ -403,7 +604,7 @@ def get_aqi_category(aqi: int) -> Dict:
 @app.post("/api/health-recommendations")
 async def get_health_recommendations(request: HealthRequest):
     """Get personalized health recommendations based on AQI and user profile."""
-    recommendations = get_health_recommendation(request.aqi, request.profile)
+    recommendations = lookup_health_recommendation(request.aqi, request.profile)
     return {
         "aqi": request.aqi,
         "profile": request.profile.dict(),
@@ -411,14 +612,44 @@ async def get_health_recommendations(request: HealthRequest):
         "timestamp": datetime.utcnow().isoformat()
     }
 
+@app.post("/api/health-recommendations/batch")
+async def get_health_recommendations_batch(request: HealthBatchRequest):
+    """
+    Recommendations for many (aqi, profile) pairs at once, in request order.
+    With compact=true each item carries a key into `recommendations` instead of a full copy.
+    """
+    if len(request.items) > MAX_HEALTH_BATCH:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_HEALTH_BATCH} items per batch")
+
+    keys = [health_table_key(item.aqi, item.profile) for item in request.items]
+    if request.compact:
+        used = {f"{HEALTH_TABLE[k]['severity']}:{'sensitive' if k[1] else 'general'}": k for k in set(keys)}
+        names = {k: name for name, k in used.items()}
+        results = [{"aqi": item.aqi, "recommendation": names[k]} for item, k in zip(request.items, keys)]
+        table = {name: HEALTH_TABLE[k] for name, k in used.items()}
+    else:
+        results = [{"aqi": item.aqi, "recommendations": HEALTH_TABLE[k]} for item, k in zip(request.items, keys)]
+        table = None
+
+    content = {
+        "results": results,
+        "recommendations": table,
+        "count": len(results),
+        "timestamp": datetime.utcnow().isoformat()
+    }
+    # Everything is already plain JSON types, so skip FastAPI's per-object encoding pass
+    return JSONResponse(content=content)
+
 @app.post("/api/feedback")
 async def submit_feedback(feedback: FeedbackCreate):
     """Submit crowdsourced air quality feedback."""
     feedback_entry = feedback.dict()
     feedback_entry['timestamp'] = datetime.utcnow().isoformat()
-    feedback_entry['id'] = len(feedback_store) + 1
     
-    feedback_store.append(feedback_entry)
+    # Resolves once the entry is committed, with its database ID
+    feedback_entry = await feedback_writer.submit(feedback_entry)
+    # Index the new row (and anything other workers committed) so summaries include it right away
+    await sync_feedback_store()
     
     return {
         "message": "Feedback submitted successfully",
@@ -428,78 +659,110 @@ async def submit_feedback(feedback: FeedbackCreate):
 @app.get("/api/feedback")
 async def get_feedback(site: Optional[int] = None, limit: int = 50):
     """Get recent crowdsourced feedback."""
-    filtered_feedback = feedback_store
-    
-    if site:
-        filtered_feedback = [f for f in feedback_store if f['site'] == site]
-    
-    # Return most recent first
-    filtered_feedback = sorted(
-        filtered_feedback, 
-        key=lambda x: x['timestamp'], 
-        reverse=True
-    )[:limit]
+    # Most recent first, read straight from the store's time-ordered index
+    await sync_feedback_store()
+    filtered_feedback = feedback_store.latest(site=site or None, limit=limit)
     
     return {"feedback": filtered_feedback, "count": len(filtered_feedback)}
 
+@app.get("/api/feedback/summary")
+async def get_feedback_summary(site: Optional[int] = None, window_minutes: int = 60):
+    """Count feedback per feeling over the last `window_minutes`, for one site or every site."""
+    if not 0 < window_minutes * 60 <= feedback_counters.retention_seconds:
+        raise HTTPException(
+            status_code=400,
+            detail=f"window_minutes must be between 1 and {feedback_counters.retention_seconds // 60}"
+        )
+    await sync_feedback_store()
+    by_site = feedback_counters.summary(site=site, window_seconds=window_minutes * 60)
+
+    # Totals over the returned sites (just the one when `site` is given)
+    counts = {feeling: 0 for feeling in FEELINGS}
+    for site_counts in by_site.values():
+        for feeling, n in site_counts.items():
+            counts[feeling] = counts.get(feeling, 0) + n
+
+    return {
+        "site": site,
+        "window_minutes": window_minutes,
+        "counts": counts,
+        "total": sum(counts.values()),
+        "by_site": by_site if site is None else None
+    }
+
+@app.get("/api/feedback/stats")
+async def get_feedback_stats():
+    """Entry counts of the feedback store and group-commit statistics of the writer."""
+    await sync_feedback_store()
+    stats = feedback_store.stats()
+    stats["writer"] = feedback_writer.stats()
+    return stats
+
 @app.get("/api/download/forecast/{site_id}")
-async def download_forecast(site_id: int, pollutant: str = "O3", horizon: int = 24):
-    """Generate and return CSV file for download."""
+async def download_forecast(site_id: int, pollutant: str = "O3", horizon: int = 24, compress: bool = False):
+    """Stream the forecast as a CSV download (gzip-compressed with compress=true)."""
     if site_id not in range(1, 8):
         raise HTTPException(status_code=404, detail="Site not found")
-    
-    pred_file = os.path.join(BASE_DIR, "predictions", f"predictions_site_{site_id}.csv")
+
+    if pollutant not in POLLUTANTS and pollutant != "all":
+        raise HTTPException(status_code=400, detail=f"Unknown pollutant {pollutant}")
     
     try:
-        df = pd.read_csv(pred_file)
-        df['timestamp'] = pd.to_datetime(df[['year', 'month', 'day', 'hour']])
-        df = df.sort_values('timestamp').reset_index(drop=True)
-        df = df.head(horizon)
-        
-        # Create temporary CSV in the same base directory
-        temp_dir = os.path.join(BASE_DIR, "temp")
-        os.makedirs(temp_dir, exist_ok=True)
-        output_file = os.path.join(temp_dir, f"temp_forecast_{site_id}_{pollutant}_{horizon}hrs.csv")
-        df.to_csv(output_file, index=False)
-        
-        return FileResponse(
-            output_file,
-            media_type='text/csv',
-            filename=f"forecast_{site_id}_{pollutant}_{horizon}hrs.csv"
-        )
-    
+        df = forecast_cache.get(site_id).frame.head(horizon)
     except FileNotFoundError:
         raise HTTPException(
             status_code=404, 
             detail=f"Prediction file not found for site {site_id}"
         )
 
+    # Only ship the time columns and the requested pollutant's columns
+    df = pollutant_columns(df, pollutant)
+
+    filename = f"forecast_{site_id}_{pollutant}_{horizon}hrs.csv"
+    media_type = 'text/csv'
+    if compress:
+        filename += ".gz"
+        media_type = 'application/gzip'
+
+    return StreamingResponse(
+        iter_csv_chunks(df, compress=compress),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
 # ============================================================================
 # BACKGROUND TASKS (Optional: for periodic AQI updates)
 # ============================================================================
 
-aqi_cache = {}
-
-async def update_aqi_cache():
-    """Background task to update AQI cache periodically."""
-    while True:
-        try:
-            # Update AQI for Delhi coordinates
-            lat, lon = 28.6139, 77.2090
-            aqi_data = await get_current_aqi(lat, lon)
-            aqi_cache['delhi'] = aqi_data
-        except Exception as e:
-            print(f"Error updating AQI cache: {e}")
-        
-        # Wait 30 minutes before next update
-        await asyncio.sleep(1800)
+# Refreshes the live AQI of the monitoring sites listed in Data_SIH_2025/lat_lon_sites.txt
+SITE_COORDINATES_PATH = os.path.join(BASE_DIR, "..", "Data_SIH_2025", "lat_lon_sites.txt")
+aqi_refresher = AQIRefresher(
+    aqi_client,
+    load_site_coordinates(SITE_COORDINATES_PATH) if os.path.exists(SITE_COORDINATES_PATH) else {},
+    interval=AQI_REFRESH_INTERVAL
+)
+# On by default only when a real API key is configured; AQI_REFRESH=1/0 forces it on/off
+OWM_API_KEY_CONFIGURED = OWM_API_KEY not in ("", "YOUR_OPENWEATHERMAP_API_KEY")
+AQI_REFRESH_ENABLED = os.environ.get("AQI_REFRESH", "1" if OWM_API_KEY_CONFIGURED else "0") != "0"
 
 @app.on_event("startup")
 async def startup_event():
     """Initialize background tasks on startup."""
-    # Uncomment to enable background AQI updates
-    # asyncio.create_task(update_aqi_cache())
-    pass
+    metrics_index.refresh()
+    model_store.update(model_registry.load_all(SITE_IDS))
+    # Warm the feedback index with the newest stored entries
+    for entry in feedback_db.recent(feedback_store.max_entries):
+        feedback_store.add(entry)
+        feedback_counters.add(entry)
+    if AQI_REFRESH_ENABLED:
+        aqi_refresher.start()
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Commit any queued feedback and close the upstream connections before exiting."""
+    await feedback_writer.close()
+    await aqi_refresher.stop()
+    await aqi_client.aclose()
 
 if __name__ == "__main__":
     import uvicorn
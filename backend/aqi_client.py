@@ -0,0 +1,143 @@
+## Shared client for the OpenWeatherMap air pollution API: pooled connections, TTL cache, single-flight.
+
+import asyncio
+import time
+from collections import OrderedDict
+from datetime import datetime
+
+import httpx
+
+OWM_AIR_POLLUTION_URL = "http://api.openweathermap.org/data/2.5/air_pollution"
+
+
+class AQIClient:
+    """
+    Fetches current air pollution readings, reusing one long-lived httpx client.
+
+    Results are cached for `ttl` seconds per location, with lat/lon rounded to
+    `precision` decimals (2 decimals is about 1 km) so nearby lookups share an
+    entry. Concurrent lookups of a location that is not cached share a single
+    upstream call. Failed calls raise and are not cached. With allow_stale=True
+    an expired entry is returned at once while it is re-fetched in the background.
+    """
+
+    def __init__(self, api_key, url=OWM_AIR_POLLUTION_URL, ttl=600, precision=2, timeout=10.0,
+                 max_connections=20, max_entries=1024, transport=None):
+        self.api_key = api_key
+        self.url = url
+        self.ttl = ttl
+        self.precision = precision
+        self.timeout = timeout
+        self.max_connections = max_connections
+        self.max_entries = max_entries
+        self.transport = transport
+        self._client = None
+        self._cache = OrderedDict()
+        self._inflight = {}
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.upstream_calls = 0
+        self.errors = 0
+
+    def _get_client(self):
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                timeout=self.timeout,
+                limits=httpx.Limits(max_connections=self.max_connections,
+                                    max_keepalive_connections=self.max_connections),
+                transport=self.transport
+            )
+        return self._client
+
+    def location_key(self, lat, lon):
+        return round(lat, self.precision), round(lon, self.precision)
+
+    def cached(self, lat, lon):
+        """Returns the cached reading for a location (even if expired), or None."""
+        entry = self._cache.get(self.location_key(lat, lon))
+        return entry[1] if entry else None
+
+    async def get(self, lat, lon, allow_stale=False):
+        """
+        Returns {"reading": <OWM list[0] item>, "fetched_at": ISO time, "cached": bool, "stale": bool}
+        for a location, calling upstream only when there is no fresh cache entry.
+        """
+        key = self.location_key(lat, lon)
+        entry = self._cache.get(key)
+        if entry is not None:
+            self._cache.move_to_end(key)
+            if entry[0] > time.monotonic():
+                self.hits += 1
+                return dict(entry[1], cached=True, stale=False)
+            if allow_stale:
+                self.stale_hits += 1
+                self._start_fetch(key)
+                return dict(entry[1], cached=True, stale=True)
+        self.misses += 1
+
+        # shield: one caller giving up must not cancel the call the others are waiting on
+        result = await asyncio.shield(self._start_fetch(key))
+        return dict(result, cached=False, stale=False)
+
+    async def refresh(self, lat, lon):
+        """Fetches a location from upstream now, whatever the cache holds, and caches the result."""
+        result = await asyncio.shield(self._start_fetch(self.location_key(lat, lon)))
+        return dict(result, cached=False, stale=False)
+
+    def _start_fetch(self, key):
+        """Returns the in-flight upstream call for a location, starting one if there is none."""
+        task = self._inflight.get(key)
+        if task is not None:
+            self.coalesced += 1
+            return task
+        task = asyncio.ensure_future(self._fetch(key))
+        self._inflight[key] = task
+        task.add_done_callback(lambda t: self._fetch_done(key, t))
+        return task
+
+    def _fetch_done(self, key, task):
+        self._inflight.pop(key, None)
+        # Mark the error as retrieved: background re-fetches may have nobody awaiting them
+        if not task.cancelled():
+            task.exception()
+
+    async def _fetch(self, key):
+        lat, lon = key
+        self.upstream_calls += 1
+        try:
+            response = await self._get_client().get(
+                self.url, params={"lat": lat, "lon": lon, "appid": self.api_key}
+            )
+            response.raise_for_status()
+            reading = response.json()['list'][0]
+        except Exception:
+            self.errors += 1
+            raise
+
+        result = {"reading": reading, "fetched_at": datetime.utcnow().isoformat()}
+        self._cache[key] = (time.monotonic() + self.ttl, result)
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.max_entries:
+            self._cache.popitem(last=False)
+        return result
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    def stats(self):
+        now = time.monotonic()
+        return {
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "upstream_calls": self.upstream_calls,
+            "errors": self.errors,
+            "cached_locations": len(self._cache),
+            "fresh_locations": sum(1 for expires, _ in self._cache.values() if expires > now),
+            "ttl_seconds": self.ttl
+        }
@@ -0,0 +1,135 @@
+## Keeps the live AQI of every monitoring site warm in the AQIClient cache.
+
+import asyncio
+import random
+import time
+from datetime import datetime
+
+import httpx
+
+
+def load_site_coordinates(path):
+    """Reads lat_lon_sites.txt (tab-separated: Site, Latitude N, Longitude E) into {site: (lat, lon)}."""
+    sites = {}
+    with open(path, 'r') as f:
+        next(f)  # header
+        for line in f:
+            parts = line.split()
+            if len(parts) >= 3:
+                sites[int(parts[0])] = (float(parts[1]), float(parts[2]))
+    return sites
+
+
+def _describe_error(e):
+    # Never echo the request URL: it carries the API key
+    if isinstance(e, httpx.HTTPStatusError):
+        return f"HTTP {e.response.status_code}"
+    return type(e).__name__
+
+
+class SiteRefreshState:
+    __slots__ = ("lat", "lon", "last_success", "last_success_at", "last_attempt_at",
+                 "last_error", "failures", "refreshes")
+
+    def __init__(self, lat, lon):
+        self.lat = lat
+        self.lon = lon
+        self.last_success = None
+        self.last_success_at = None
+        self.last_attempt_at = None
+        self.last_error = None
+        self.failures = 0
+        self.refreshes = 0
+
+
+class AQIRefresher:
+    """
+    Refreshes every site's reading in the background so request handlers only read the cache.
+
+    Each site runs its own loop: it starts after a short random delay and then
+    sleeps `interval` +/- `jitter` (a fraction), so the sites drift apart and
+    never hit upstream in lockstep. At most `concurrency` upstream calls run at
+    once. A failed refresh is retried with exponential backoff, capped at the
+    interval.
+    """
+
+    def __init__(self, client, sites, interval=600, jitter=0.1, concurrency=3,
+                 retry_delay=15, stale_after=None):
+        self.client = client
+        self.interval = interval
+        self.jitter = jitter
+        self.retry_delay = retry_delay
+        # A reading older than this is reported as stale (default: two missed refreshes)
+        self.stale_after = stale_after or 2 * interval
+        self.sites = {site: SiteRefreshState(lat, lon) for site, (lat, lon) in sites.items()}
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._tasks = []
+
+    def _next_delay(self, state):
+        if state.failures:
+            return min(self.interval, self.retry_delay * 2 ** (state.failures - 1))
+        return self.interval * random.uniform(1 - self.jitter, 1 + self.jitter)
+
+    async def refresh_site(self, site):
+        state = self.sites[site]
+        async with self._semaphore:
+            state.last_attempt_at = datetime.utcnow().isoformat()
+            try:
+                await self.client.refresh(state.lat, state.lon)
+            except Exception as e:
+                state.failures += 1
+                state.last_error = _describe_error(e)
+                return False
+        state.last_success = time.monotonic()
+        state.last_success_at = state.last_attempt_at
+        state.last_error = None
+        state.failures = 0
+        state.refreshes += 1
+        return True
+
+    async def refresh_all(self):
+        """Refreshes every site once (bounded by the concurrency limit); returns {site: ok}."""
+        results = await asyncio.gather(*(self.refresh_site(site) for site in self.sites))
+        return dict(zip(self.sites, results))
+
+    async def _site_loop(self, site, initial_delay):
+        await asyncio.sleep(initial_delay)
+        while True:
+            await self.refresh_site(site)
+            await asyncio.sleep(self._next_delay(self.sites[site]))
+
+    def start(self):
+        """Starts one background loop per site on the running event loop."""
+        if self._tasks:
+            return
+        # Warm every site right away, spread over a few seconds, then settle into the jittered schedule
+        spread = min(5.0, self.interval * self.jitter)
+        self._tasks = [
+            asyncio.ensure_future(self._site_loop(site, random.uniform(0, spread)))
+            for site in self.sites
+        ]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def staleness(self):
+        """Per-site age of the last successful refresh, with the last error if the latest one failed."""
+        now = time.monotonic()
+        report = {}
+        for site, state in self.sites.items():
+            age = None if state.last_success is None else now - state.last_success
+            report[site] = {
+                "lat": state.lat,
+                "lon": state.lon,
+                "last_refreshed": state.last_success_at,
+                "age_seconds": age,
+                "stale": age is None or age > self.stale_after,
+                "last_attempt": state.last_attempt_at,
+                "consecutive_failures": state.failures,
+                "last_error": state.last_error,
+                "refreshes": state.refreshes
+            }
+        return report
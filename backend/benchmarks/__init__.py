@@ -0,0 +1,2 @@
+## Benchmark scripts for the pipeline and the API.
+## Run them from the backend directory, e.g. `python -m benchmarks.bench_prediction_store`.
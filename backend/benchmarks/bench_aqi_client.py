@@ -0,0 +1,102 @@
+## Real-time AQI lookups: a new httpx client per request (the old get_current_aqi) vs the shared AQIClient.
+## Runs the fake upstream (benchmarks/fake_owm.py) as a real HTTP server so connection reuse counts.
+## Usage: python -m benchmarks.bench_aqi_client [--requests 500] [--concurrency 50] [--latency 0.05]
+
+import argparse
+import asyncio
+import subprocess
+import sys
+import time
+
+from benchmarks.common import BACKEND_DIR, print_table, wait_for_http
+
+import httpx
+import numpy as np
+
+from aqi_client import AQIClient
+
+# Dashboard-style traffic: a handful of locations, each requested many times
+LOCATIONS = [(28.6139, 77.2090), (28.7041, 77.1025), (28.5355, 77.3910), (28.4595, 77.0266),
+             (28.6692, 77.4538), (28.5245, 77.1855), (28.6304, 77.2177)]
+
+
+async def old_lookup(url, lat, lon):
+    async with httpx.AsyncClient() as client:
+        response = await client.get(url, params={"lat": lat, "lon": lon, "appid": "bench"}, timeout=10.0)
+        response.raise_for_status()
+        return response.json()['list'][0]
+
+
+async def run(lookup, n_requests, concurrency):
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def one(i):
+        lat, lon = LOCATIONS[i % len(LOCATIONS)]
+        async with semaphore:
+            start = time.perf_counter()
+            await lookup(lat, lon)
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(n_requests)))
+    return time.perf_counter() - start, np.array(latencies) * 1000
+
+
+async def upstream_calls(base):
+    async with httpx.AsyncClient() as client:
+        return (await client.get(f"{base}/stats")).json()["calls"]
+
+
+async def main_async(args):
+    base = f"http://127.0.0.1:{args.port}"
+    url = f"{base}/data/2.5/air_pollution"
+    rows = []
+
+    before = await upstream_calls(base)
+    elapsed, latencies = await run(lambda lat, lon: old_lookup(url, lat, lon), args.requests, args.concurrency)
+    rows.append(["new client per request", await upstream_calls(base) - before, f"{elapsed:.2f} s",
+                 f"{np.percentile(latencies, 50):.1f} ms", f"{np.percentile(latencies, 95):.1f} ms"])
+
+    client = AQIClient("bench", url=url)
+    before = await upstream_calls(base)
+    elapsed, latencies = await run(client.get, args.requests, args.concurrency)
+    rows.append(["AQIClient (cold cache)", await upstream_calls(base) - before, f"{elapsed:.2f} s",
+                 f"{np.percentile(latencies, 50):.1f} ms", f"{np.percentile(latencies, 95):.1f} ms"])
+
+    # Same traffic again with the TTL cache warm
+    before = await upstream_calls(base)
+    elapsed, latencies = await run(client.get, args.requests, args.concurrency)
+    rows.append(["AQIClient (warm cache)", await upstream_calls(base) - before, f"{elapsed:.2f} s",
+                 f"{np.percentile(latencies, 50):.1f} ms", f"{np.percentile(latencies, 95):.1f} ms"])
+    stats = client.stats()
+    await client.aclose()
+
+    print(f"{args.requests} lookups over {len(LOCATIONS)} locations, {args.concurrency} concurrent, "
+          f"upstream latency {args.latency * 1000:.0f} ms\n")
+    print_table(["client", "upstream calls", "wall clock", "p50", "p95"], rows)
+    print(f"\nAQIClient: {stats['coalesced']} lookups coalesced onto in-flight calls, {stats['hits']} cache hits")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="AQI client pooling / caching benchmark")
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--port", type=int, default=9017)
+    args = parser.parse_args()
+
+    server = subprocess.Popen(
+        [sys.executable, "-m", "benchmarks.fake_owm", "--port", str(args.port), "--latency", str(args.latency)],
+        cwd=BACKEND_DIR, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        wait_for_http(f"http://127.0.0.1:{args.port}/stats")
+        asyncio.run(main_async(args))
+    finally:
+        server.terminate()
+        server.wait()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+## Forecast payload size and build+serialize time: row records (FastAPI encoder) vs format=columnar.
+## Usage: python -m benchmarks.bench_columnar [--repeat 5]
+
+import argparse
+import gzip
+import json
+
+from benchmarks.common import time_call, format_bytes, print_table
+from benchmarks.bench_prediction_store import HORIZONS, make_predictions_frame
+
+import numpy as np
+import pandas as pd
+from fastapi.encoders import jsonable_encoder
+
+import forecast_cache
+
+
+def make_frame(hours):
+    """A prediction frame as ForecastCache holds it: timestamp column, targets mostly missing."""
+    df = make_predictions_frame(hours)
+    df['O3_target'] = np.nan
+    df['NO2_target'] = np.nan
+    df['timestamp'] = pd.date_range("2025-10-12", periods=hours, freq="h")
+    return df
+
+
+def records_response(df):
+    # What get_site_data returns today, encoded the way FastAPI encodes a dict return value
+    payload = {"site": 1, "horizon": len(df), "data": forecast_cache.frame_to_records(df)}
+    return json.dumps(jsonable_encoder(payload), ensure_ascii=False, allow_nan=False,
+                      separators=(",", ":")).encode()
+
+
+def columnar_response(df, serializer):
+    payload = {"site": 1, "horizon": len(df), "format": "columnar"}
+    payload.update(forecast_cache.frame_to_columnar(df))
+    saved, forecast_cache.orjson = forecast_cache.orjson, serializer
+    try:
+        return forecast_cache.dumps_json(payload)
+    finally:
+        forecast_cache.orjson = saved
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Records vs columnar forecast payloads")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    cases = {"records (FastAPI encoder)": records_response,
+             "columnar, stdlib json": lambda df: columnar_response(df, None)}
+    if forecast_cache.orjson is not None:
+        cases["columnar, orjson"] = lambda df: columnar_response(df, forecast_cache.orjson)
+    else:
+        print("orjson is not installed; only the stdlib fallback is measured\n")
+
+    rows = []
+    for label, hours in HORIZONS.items():
+        df = make_frame(hours)
+        for name, build in cases.items():
+            body = build(df)
+            seconds = time_call(lambda: build(df), repeat=args.repeat)
+            rows.append([label, name, format_bytes(len(body)), format_bytes(len(gzip.compress(body))),
+                         f"{seconds * 1000:.2f} ms"])
+
+    print_table(["horizon", "payload", "size", "gzipped", "build + serialize"], rows)
+
+
+if __name__ == "__main__":
+    main()
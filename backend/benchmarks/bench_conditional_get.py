@@ -0,0 +1,70 @@
+## Cost of repeat polls of the forecast and metrics endpoints: full response vs gzip vs 304 revalidation.
+## Uses the prediction/metrics files in backend/ (run main.py first).
+## Usage: python -m benchmarks.bench_conditional_get [--requests 200] [--horizon 48]
+
+import argparse
+import asyncio
+import os
+import time
+
+from benchmarks.common import format_bytes, print_table
+from benchmarks.bench_columnar import records_response
+
+# No background AQI refresh during the benchmark
+os.environ.setdefault("AQI_REFRESH", "0")
+
+import httpx  # noqa: E402
+
+import app as api  # noqa: E402
+
+
+async def poll(client, url, headers, n):
+    wire_bytes = 0
+    start = time.perf_counter()
+    for _ in range(n):
+        r = await client.get(url, headers=headers)
+        assert r.status_code in (200, 304), r.status_code
+        # Bytes as sent, before httpx decodes the content encoding
+        wire_bytes += int(r.headers.get("content-length", len(r.content)))
+    return (time.perf_counter() - start) / n, wire_bytes / n, r.status_code
+
+
+async def main_async(args):
+    site_url = f"/api/data/site/1?horizon={args.horizon}"
+    rows = []
+    transport = httpx.ASGITransport(app=api.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for url in (site_url, "/api/metrics/all"):
+            first = await client.get(url, headers={"Accept-Encoding": "identity"})
+            etag = first.headers["etag"]
+            cases = [
+                ("full body", {"Accept-Encoding": "identity"}),
+                ("gzip", {"Accept-Encoding": "gzip"}),
+                ("If-None-Match (304)", {"Accept-Encoding": "gzip", "If-None-Match": etag}),
+            ]
+            for name, headers in cases:
+                seconds, size, status = await poll(client, url, headers, args.requests)
+                rows.append([url, name, status, format_bytes(size), f"{seconds * 1e6:.0f} µs"])
+
+    # Reference: serializing the records payload from scratch, as every poll did before
+    df = api.forecast_cache.get(1).frame.head(args.horizon)
+    start = time.perf_counter()
+    for _ in range(args.requests):
+        body = records_response(df)
+    rows.append([site_url, "re-encode records every poll (old)", 200,
+                 format_bytes(len(body)), f"{(time.perf_counter() - start) / args.requests * 1e6:.0f} µs"])
+
+    print(f"{args.requests} polls per case, in-process ASGI\n")
+    print_table(["endpoint", "request", "status", "bytes/response", "time/request"], rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Conditional GET / compression benchmark")
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--horizon", type=int, default=48)
+    args = parser.parse_args()
+    asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    main()
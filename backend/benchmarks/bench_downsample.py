@@ -0,0 +1,47 @@
+## Chart payload size and build time for long forecasts: every hourly row vs resolution= and points= (LTTB).
+## Usage: python -m benchmarks.bench_downsample [--repeat 5] [--points 500]
+
+import argparse
+
+from benchmarks.common import time_call, format_bytes, print_table
+from benchmarks.bench_columnar import make_frame
+from benchmarks.bench_prediction_store import HORIZONS
+
+import forecast_cache
+from downsample import shape_forecast
+
+CASES = {
+    "hourly rows": {},
+    "resolution=3h": {"resolution": "3h"},
+    "resolution=daily": {"resolution": "daily"},
+    "resolution=daily, agg=max": {"resolution": "daily", "agg": "max"},
+}
+
+
+def build(df, shape):
+    shaped = shape_forecast(df, column="O3_predicted", **shape) if shape else df
+    return forecast_cache.dumps_json({"site": 1, "data": forecast_cache.frame_to_records(shaped)})
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Forecast downsampling benchmark")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--points", type=int, default=500)
+    args = parser.parse_args()
+
+    cases = dict(CASES)
+    cases[f"points={args.points} (LTTB)"] = {"points": args.points}
+
+    rows = []
+    for label, hours in {**HORIZONS, "7 days": 168}.items():
+        df = make_frame(hours)
+        for name, shape in cases.items():
+            body = build(df, shape)
+            seconds = time_call(lambda: build(df, shape), repeat=args.repeat)
+            rows.append([label, name, format_bytes(len(body)), f"{seconds * 1000:.2f} ms"])
+
+    print_table(["horizon", "shape", "records payload", "shape + serialize"], rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+## Latency of "latest N feedback entries" as the store grows: the old list scan + sort vs FeedbackStore.
+## Usage: python -m benchmarks.bench_feedback_store [--sizes 1000 10000 100000 1000000] [--limit 50]
+
+import argparse
+from datetime import datetime, timedelta
+
+from benchmarks.common import time_call, print_table
+
+from feedback_store import FeedbackStore
+
+SITES = list(range(1, 8))
+FEELINGS = ["fresh", "smoky", "dusty", "normal"]
+
+
+def make_entries(n, start=datetime(2025, 1, 1)):
+    for i in range(n):
+        yield {
+            "site": SITES[i % len(SITES)],
+            "feeling": FEELINGS[i % len(FEELINGS)],
+            "description": None,
+            "timestamp": (start + timedelta(seconds=i)).isoformat()
+        }
+
+
+def list_latest(entries, site, limit):
+    """What get_feedback did before FeedbackStore."""
+    filtered = entries
+    if site:
+        filtered = [f for f in entries if f['site'] == site]
+    return sorted(filtered, key=lambda x: x['timestamp'], reverse=True)[:limit]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Feedback store query benchmark")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000, 1000000])
+    parser.add_argument("--limit", type=int, default=50)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    rows = []
+    for size in args.sizes:
+        entries = []
+        store = FeedbackStore(max_entries=size)
+        for entry in make_entries(size):
+            store.add(entry)
+            entries.append(entry)
+
+        # The list version gets fewer repeats at large sizes, it takes seconds per call
+        list_repeat = max(1, min(args.repeat, 100000 // size))
+        for label, site in (("site 3", 3), ("all sites", None)):
+            old = time_call(lambda: list_latest(entries, site, args.limit), repeat=list_repeat, warmup=0)
+            new = time_call(lambda: store.latest(site=site, limit=args.limit), repeat=args.repeat * 20)
+            assert [e['id'] for e in store.latest(site=site, limit=args.limit)] == \
+                   [e['id'] for e in list_latest(entries, site, args.limit)]
+            rows.append([f"{size:,}", label, f"{old * 1000:.3f} ms", f"{new * 1e6:.1f} µs", f"{old / new:,.0f}x"])
+
+    print_table(["stored", "query", "list scan + sort", "FeedbackStore", "speedup"], rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+## Paging a long forecast by time range: boolean mask over the frame vs binary search on the cached timestamps.
+## Usage: python -m benchmarks.bench_forecast_range [--repeat 20] [--page 168]
+
+import argparse
+
+from benchmarks.common import time_call, print_table
+from benchmarks.bench_prediction_store import make_predictions_frame
+
+import numpy as np
+import pandas as pd
+
+from forecast_cache import SiteForecast, frame_to_records
+
+SIZES = {"1 month": 24 * 30, "1 year": 24 * 365, "5 years": 24 * 365 * 5}
+
+
+def make_entry(hours):
+    df = make_predictions_frame(hours)
+    df['timestamp'] = pd.date_range("2025-10-12", periods=hours, freq="h")
+    return SiteForecast(1, "bench", "bench", ("bench", 0, 0), df)
+
+
+def mask_page(entry, start, end, offset, limit):
+    # Filter the whole frame, then page the copy
+    ts = entry.frame['timestamp']
+    return entry.frame[(ts >= start) & (ts < end)].iloc[offset:offset + limit]
+
+
+def search_page(entry, start, end, offset, limit):
+    lo, hi = entry.row_range(start, end)
+    page_lo = min(lo + offset, hi)
+    return entry.frame.iloc[page_lo:min(page_lo + limit, hi)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Forecast time-range paging benchmark")
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--page", type=int, default=168, help="Rows per page (default: one week)")
+    args = parser.parse_args()
+
+    rows = []
+    for label, hours in SIZES.items():
+        entry = make_entry(hours)
+        # A page from the middle of the file, second page of the requested range
+        start = entry.frame['timestamp'].iloc[hours // 2]
+        end = start + pd.Timedelta(days=30)
+        offset = args.page
+
+        expected = mask_page(entry, start, end, offset, args.page)
+        assert np.array_equal(expected.index, search_page(entry, start, end, offset, args.page).index)
+
+        mask = time_call(lambda: mask_page(entry, start, end, offset, args.page), repeat=args.repeat)
+        search = time_call(lambda: search_page(entry, start, end, offset, args.page), repeat=args.repeat)
+        records = time_call(lambda: frame_to_records(search_page(entry, start, end, offset, args.page)),
+                            repeat=args.repeat)
+        rows.append([label, f"{hours:,}", f"{mask * 1000:.3f} ms", f"{search * 1000:.3f} ms",
+                     f"{mask / search:.0f}x", f"{records * 1000:.2f} ms"])
+
+    print(f"page of {args.page} rows, offset {args.page}, inside a 30-day range\n")
+    print_table(["file", "rows", "boolean mask", "searchsorted + iloc", "speedup", "page -> records"], rows)
+
+
+if __name__ == "__main__":
+    main()
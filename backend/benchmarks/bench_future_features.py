@@ -0,0 +1,79 @@
+## Times generate_future_features across horizons to check it scales linearly,
+## against the previous row-by-row implementation for short horizons.
+## Usage: python -m benchmarks.bench_future_features
+
+import argparse
+import contextlib
+import io
+from datetime import datetime, timedelta
+
+from benchmarks.common import time_call, print_table
+
+import numpy as np
+import pandas as pd
+
+import DataParse
+import main as pipeline
+
+HORIZONS = [48, 168, 720, 2160, 8760]
+
+
+def legacy_generate_future_features(historical_df, hours_to_forecast):
+    """The original per-hour copy / mutate / concat loop, kept as the baseline."""
+    historical_df = historical_df.sort_index()
+    last_known_row = historical_df.iloc[-1:].copy()
+    forecast_start_date = datetime(2025, 10, 12, 0)
+    future_rows = []
+    for i in range(hours_to_forecast):
+        future_timestamp = forecast_start_date + timedelta(hours=i)
+        new_row = last_known_row.copy()
+        new_row['year'] = future_timestamp.year
+        new_row['month'] = future_timestamp.month
+        new_row['day'] = future_timestamp.day
+        new_row['hour'] = future_timestamp.hour
+        for col in pipeline.VARIED_FEATURES:
+            if col in new_row and pd.api.types.is_numeric_dtype(new_row[col]):
+                new_row[col] *= 1 + np.random.uniform(-0.02, 0.02)
+        future_rows.append(new_row)
+    return pd.concat(future_rows).reset_index(drop=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Future feature synthesis benchmark")
+    parser.add_argument("--site", type=int, default=1)
+    parser.add_argument("--legacy-max-hours", type=int, default=720, help="Skip the slow loop above this horizon")
+    args = parser.parse_args()
+
+    train_df, unseen_df = DataParse.load_site_data(args.site)
+    historical_df = pd.concat([train_df, unseen_df], ignore_index=True)
+    # Sorted once here: generate_future_features would otherwise re-sort the whole history on every
+    # call, a fixed cost that hides the per-row one
+    historical_df = DataParse.create_timestamp_index(historical_df).sort_index()
+
+    rows = []
+    with contextlib.redirect_stdout(io.StringIO()):
+        for hours in HORIZONS:
+            vectorized = time_call(lambda: pipeline.generate_future_features(historical_df, hours, seed=0), repeat=5)
+            legacy = None
+            if hours <= args.legacy_max_hours:
+                legacy = time_call(lambda: legacy_generate_future_features(historical_df, hours), repeat=1, warmup=0)
+            rows.append((hours, vectorized, legacy))
+
+    # Least-squares line through all horizons: a near-constant per-row slope and a good fit mean linear scaling
+    hours = np.array([h for h, _, _ in rows], dtype=np.float64)
+    seconds = np.array([v for _, v, _ in rows])
+    slope, intercept = np.polyfit(hours, seconds, 1)
+    fitted = slope * hours + intercept
+    r_squared = 1 - np.sum((seconds - fitted) ** 2) / np.sum((seconds - seconds.mean()) ** 2)
+
+    table = []
+    for (h, v, legacy), fit in zip(rows, fitted):
+        table.append([h, f"{v * 1000:.2f} ms", f"{fit * 1000:.2f} ms",
+                      "-" if legacy is None else f"{legacy * 1000:.1f} ms",
+                      "-" if legacy is None else f"{legacy / v:.0f}x"])
+    print_table(["hours", "vectorized", "linear fit", "row loop", "speedup"], table)
+    print(f"\nFit: {slope * 1e6:.3f} us/row + {intercept * 1000:.2f} ms fixed (R^2 {r_squared:.4f})")
+
+
+if __name__ == "__main__":
+    main()
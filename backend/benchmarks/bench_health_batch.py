@@ -0,0 +1,89 @@
+## Health recommendations for many household profiles: one POST each vs /api/health-recommendations/batch.
+## Usage: python -m benchmarks.bench_health_batch [--profiles 10000] [--single-sample 1000]
+
+import argparse
+import asyncio
+import os
+import random
+import time
+
+from benchmarks.common import format_bytes, print_table
+
+import httpx
+
+# No background AQI refresh during the benchmark
+os.environ.setdefault("AQI_REFRESH", "0")
+
+import app as api  # noqa: E402
+
+AGE_GROUPS = ["child", "adult", "elderly", "teen"]
+CONDITIONS = ["asthma", "heart_disease", "respiratory", "diabetes", "allergies"]
+
+
+def make_items(n, seed=0):
+    rng = random.Random(seed)
+    return [
+        {"aqi": rng.randint(0, 450),
+         "profile": {"age_group": rng.choice(AGE_GROUPS),
+                     "conditions": rng.sample(CONDITIONS, rng.randint(0, 2))}}
+        for _ in range(n)
+    ]
+
+
+def time_function_calls(items):
+    """Pure recommendation cost: the if/elif builder vs the table lookup, no HTTP."""
+    profiles = [(item["aqi"], api.UserProfile(**item["profile"])) for item in items]
+    start = time.perf_counter()
+    for aqi, profile in profiles:
+        api.get_health_recommendation(aqi, profile)
+    builder = time.perf_counter() - start
+    start = time.perf_counter()
+    for aqi, profile in profiles:
+        api.lookup_health_recommendation(aqi, profile)
+    return builder, time.perf_counter() - start
+
+
+async def time_http(items, single_sample):
+    transport = httpx.ASGITransport(app=api.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=120) as client:
+        start = time.perf_counter()
+        for item in items[:single_sample]:
+            r = await client.post("/api/health-recommendations", json=item)
+            r.raise_for_status()
+        single = (time.perf_counter() - start) / single_sample * len(items)
+
+        batches = {}
+        for compact in (False, True):
+            start = time.perf_counter()
+            r = await client.post("/api/health-recommendations/batch", json={"items": items, "compact": compact})
+            r.raise_for_status()
+            batches[compact] = (time.perf_counter() - start, len(r.content))
+    return single, batches
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Batch health recommendation benchmark")
+    parser.add_argument("--profiles", type=int, default=10000)
+    parser.add_argument("--single-sample", type=int, default=1000,
+                        help="Single POSTs actually sent; the total is extrapolated to --profiles")
+    args = parser.parse_args()
+
+    items = make_items(args.profiles)
+    builder, lookup = time_function_calls(items)
+    single, batches = asyncio.run(time_http(items, min(args.single_sample, args.profiles)))
+
+    print(f"{args.profiles:,} (aqi, profile) pairs\n")
+    print_table(["method", "time", "per profile", "response size"], [
+        ["if/elif builder (function only)", f"{builder * 1000:.1f} ms", f"{builder / len(items) * 1e6:.2f} µs", "-"],
+        ["table lookup (function only)", f"{lookup * 1000:.1f} ms", f"{lookup / len(items) * 1e6:.2f} µs", "-"],
+        [f"one POST each (from {min(args.single_sample, args.profiles):,})", f"{single * 1000:.0f} ms",
+         f"{single / len(items) * 1e6:.0f} µs", "-"],
+        ["batch POST", f"{batches[False][0] * 1000:.0f} ms", f"{batches[False][0] / len(items) * 1e6:.1f} µs",
+         format_bytes(batches[False][1])],
+        ["batch POST, compact=true", f"{batches[True][0] * 1000:.0f} ms", f"{batches[True][0] / len(items) * 1e6:.1f} µs",
+         format_bytes(batches[True][1])],
+    ])
+
+
+if __name__ == "__main__":
+    main()
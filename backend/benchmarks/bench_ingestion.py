@@ -0,0 +1,57 @@
+## Compares the default CSV loading against DataParse's typed fast path over all 14 site files.
+## Usage: python -m benchmarks.bench_ingestion [--engine auto|c|pyarrow]
+
+import argparse
+import glob
+import os
+import tempfile
+
+from benchmarks.common import time_call, format_bytes, print_table
+
+import pandas as pd
+
+import DataParse
+
+DATA_DIR = DataParse.DATA_DIR
+
+
+def default_read(path):
+    df = pd.read_csv(path)
+    df.columns = df.columns.str.strip()
+    return df
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Site CSV ingestion benchmark")
+    parser.add_argument("--engine", default="auto")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    paths = sorted(glob.glob(os.path.join(DATA_DIR, "site_*_*.csv")))
+    engine = DataParse._csv_engine(args.engine)
+    print(f"{len(paths)} files, typed parser engine: {engine}\n")
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        cases = {
+            "default read_csv": default_read,
+            "typed (no cache)": lambda p: DataParse.read_site_csv(p, engine, use_cache=False),
+            "typed (cache hit)": lambda p: DataParse.read_site_csv(p, engine, use_cache=True, cache_dir=cache_dir),
+        }
+        # Populate the cache once so the "cache hit" case measures reuse only
+        for path in paths:
+            DataParse.read_site_csv(path, engine, use_cache=True, cache_dir=cache_dir)
+
+        rows = []
+        for label, reader in cases.items():
+            load_s = time_call(lambda: [reader(p) for p in paths], repeat=args.repeat)
+            frames = [reader(p) for p in paths]
+            index_s = time_call(
+                lambda: [DataParse.create_timestamp_index(df.copy()) for df in frames], repeat=args.repeat
+            )
+            memory = sum(df.memory_usage(deep=True).sum() for df in frames)
+            rows.append([label, f"{load_s * 1000:.1f} ms", f"{index_s * 1000:.1f} ms", format_bytes(memory)])
+
+    print_table(["reader", "load 14 files", "create_timestamp_index", "in-memory size"], rows)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+## Peak memory of the pipeline's data stages (load, preprocess, split), default vs --low-memory.
+## Training is left out: xgboost's native allocations are not visible to tracemalloc.
+## Usage: python -m benchmarks.bench_low_memory [--site 1] [--years 1 5 10]
+
+import argparse
+import gc
+
+from benchmarks.common import format_bytes, print_table
+
+import numpy as np
+import pandas as pd
+from sklearn.model_selection import train_test_split
+
+import DataParse
+import stage_memory
+
+
+def tile_years(df, years):
+    """Repeats a site's rows `years` times, shifting the year column, to mimic a longer history."""
+    if years == 1:
+        return df
+    # Shift by whole leap-year cycles so 29 February stays a valid date
+    span = -(-(int(df['year'].max() - df['year'].min()) + 1) // 4) * 4
+    copies = []
+    for i in range(years):
+        copy = df.copy()
+        copy['year'] = (copy['year'] + i * span).astype(df['year'].dtype)
+        copies.append(copy)
+    return pd.concat(copies, ignore_index=True)
+
+
+def run_stages(site_no, years, low_memory):
+    train_df, unseen_df = DataParse.load_site_data(site_no, fast=low_memory)
+    train_df, unseen_df = tile_years(train_df, years), tile_years(unseen_df, years)
+    gc.collect()
+
+    report = stage_memory.StageMemoryReport().start()
+    unseen_df = unseen_df.drop(columns=DataParse.TARGETS, errors='ignore')
+    if low_memory:
+        # As main.load_historical_parts: no concatenated copy of the history
+        historical_df = [DataParse.create_timestamp_index(train_df), DataParse.create_timestamp_index(unseen_df)]
+    else:
+        historical_df = DataParse.create_timestamp_index(pd.concat([train_df, unseen_df], ignore_index=True))
+    del train_df, unseen_df
+    n_rows = sum(len(part) for part in historical_df) if low_memory else len(historical_df)
+    report.mark("load")
+
+    if low_memory:
+        X, y, _ = DataParse.preprocess_compact(historical_df)
+        del historical_df
+    else:
+        X, y, _ = DataParse.preprocess_data(historical_df.reset_index())
+    report.mark("preprocess")
+
+    if low_memory:
+        n_train = len(X) - int(np.ceil(0.2 * len(X)))
+        splits = X[:n_train], X[n_train:], y.iloc[:n_train], y.iloc[n_train:]
+    else:
+        splits = train_test_split(X, y, test_size=0.2, random_state=42, shuffle=False)
+    report.mark("split")
+    report.stop()
+    return report, n_rows, X.nbytes, splits
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Default vs low-memory preprocessing peak memory")
+    parser.add_argument("--site", type=int, default=1)
+    parser.add_argument("--years", type=int, nargs="+", default=[1, 5, 10])
+    args = parser.parse_args()
+
+    rows = []
+    for years in args.years:
+        for label, low_memory in (("default", False), ("low-memory", True)):
+            report, n_rows, x_bytes, _ = run_stages(args.site, years, low_memory)
+            peaks = {s["stage"]: s["peak_bytes"] for s in report.stages}
+            rows.append([
+                f"x{years}", label, n_rows, format_bytes(x_bytes),
+                format_bytes(peaks["load"]), format_bytes(peaks["preprocess"]),
+                format_bytes(peaks["split"]), format_bytes(report.stages[-1]["held_bytes"])
+            ])
+            gc.collect()
+
+    print_table(["history", "mode", "rows", "X matrix", "load peak", "preprocess peak",
+                 "split peak", "held after split"], rows)
+
+
+if __name__ == "__main__":
+    main()
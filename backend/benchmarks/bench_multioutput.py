@@ -0,0 +1,55 @@
+## Compares the two-model training path against the single multi-output model.
+## Usage: python -m benchmarks.bench_multioutput [--sites 1 2] [--rounds 5000]
+
+import argparse
+import contextlib
+import io
+import time
+
+from benchmarks.common import load_site_split, time_call, format_bytes, print_table
+
+import data_modeling
+
+
+def model_bytes(models):
+    return sum(len(m.get_booster().save_raw(raw_format="ubj")) for m in models.values())
+
+
+def run_mode(X_train, X_test, y_train, y_test, multi_output, rounds, n_jobs):
+    # Silence the per-target progress prints
+    with contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        models, metrics = data_modeling.train_xgboost_models(
+            X_train, y_train, X_test, y_test, n_jobs=n_jobs, multi_output=multi_output, n_estimators=rounds
+        )
+        train_s = time.perf_counter() - start
+        predict_s = time_call(lambda: data_modeling.predict(models, X_test), repeat=5)
+    return models, metrics, train_s, predict_s
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Two-model vs multi-output training benchmark")
+    parser.add_argument("--sites", type=int, nargs="+", default=[1])
+    parser.add_argument("--rounds", type=int, default=5000, help="Maximum boosting rounds (early stopping still applies)")
+    parser.add_argument("--n-jobs", type=int, default=-1)
+    args = parser.parse_args()
+
+    rows = []
+    for site_no in args.sites:
+        X_train, X_test, y_train, y_test = load_site_split(site_no)
+        for label, multi_output in (("two models", False), ("multi-output", True)):
+            models, metrics, train_s, predict_s = run_mode(
+                X_train, X_test, y_train, y_test, multi_output, args.rounds, args.n_jobs
+            )
+            rows.append([
+                site_no, label, f"{train_s:.1f} s", format_bytes(model_bytes(models)),
+                f"{predict_s * 1000:.1f} ms",
+                f"{metrics['O3_target']['RMSE']:.2f} / {metrics['O3_target']['R2']:.3f}",
+                f"{metrics['NO2_target']['RMSE']:.2f} / {metrics['NO2_target']['R2']:.3f}",
+            ])
+
+    print_table(["site", "mode", "train", "model size", "predict (test set)", "O3 RMSE / R2", "NO2 RMSE / R2"], rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+## Compares loading predictions from CSV against the memory-mapped columnar bundle.
+## Usage: python -m benchmarks.bench_prediction_store [--repeat 5]
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.common import BACKEND_DIR, time_call, rss_bytes, format_bytes, print_table
+
+import numpy as np
+import pandas as pd
+
+import prediction_store
+
+HORIZONS = {"48h": 48, "1 year": 24 * 365}
+FEATURE_COLUMNS = ['O3_forecast', 'NO2_forecast', 'T_forecast', 'q_forecast',
+                   'u_forecast', 'v_forecast', 'w_forecast',
+                   'NO2_satellite', 'HCHO_satellite', 'ratio_satellite']
+
+
+def make_predictions_frame(hours, seed=0):
+    """Builds a frame shaped like main.py's forecast output."""
+    rng = np.random.default_rng(seed)
+    ts = pd.date_range("2025-10-12", periods=hours, freq="h")
+    df = pd.DataFrame({
+        'year': ts.year.astype(np.int64),
+        'month': ts.month.astype(np.int64),
+        'day': ts.day.astype(np.int64),
+        'hour': ts.hour.astype(np.int64),
+    })
+    for col in FEATURE_COLUMNS:
+        df[col] = rng.normal(50, 20, hours).round(2)
+    df['O3_predicted'] = rng.normal(40, 15, hours).astype(np.float32)
+    df['NO2_predicted'] = rng.normal(35, 10, hours).astype(np.float32)
+    return df
+
+
+def run_child(fmt, csv_path, repeat):
+    """Measures one (format, file) pair in a fresh interpreter so RSS numbers are not shared."""
+    reader = prediction_store.read_prediction_bundle if fmt == "bundle" else prediction_store.read_prediction_csv
+    rss_before = rss_bytes()
+    start = time.perf_counter()
+    df = reader(csv_path)
+    first_load = time.perf_counter() - start
+    rss_after = rss_bytes()
+    median = time_call(lambda: reader(csv_path), repeat=repeat, warmup=0)
+    print(json.dumps({
+        "rows": len(df),
+        "first_load_s": first_load,
+        "median_load_s": median,
+        "rss_delta": rss_after - rss_before
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="CSV vs columnar bundle load benchmark")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--child", nargs=2, metavar=("FORMAT", "CSV_PATH"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_child(args.child[0], args.child[1], args.repeat)
+        return
+
+    rows = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for label, hours in HORIZONS.items():
+            csv_path = os.path.join(tmp, f"predictions_{hours}.csv")
+            df = make_predictions_frame(hours)
+            df.to_csv(csv_path, index=False)
+            prediction_store.write_prediction_bundle(df, csv_path)
+            bundle_size = sum(os.path.getsize(p) for p in prediction_store.bundle_paths(csv_path).values())
+
+            for fmt, size in (("csv", os.path.getsize(csv_path)), ("bundle", bundle_size)):
+                out = subprocess.run(
+                    [sys.executable, "-m", "benchmarks.bench_prediction_store",
+                     "--repeat", str(args.repeat), "--child", fmt, csv_path],
+                    cwd=BACKEND_DIR, capture_output=True, text=True, check=True
+                )
+                result = json.loads(out.stdout.strip().splitlines()[-1])
+                rows.append([
+                    label, fmt, result["rows"], format_bytes(size),
+                    f"{result['first_load_s'] * 1000:.2f} ms",
+                    f"{result['median_load_s'] * 1000:.2f} ms",
+                    format_bytes(result["rss_delta"])
+                ])
+
+    print_table(["horizon", "format", "rows", "on disk", "first load", "median load", "RSS delta"], rows)
+
+
+if __name__ == "__main__":
+    main()
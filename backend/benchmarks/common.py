@@ -0,0 +1,81 @@
+## Shared helpers for the benchmark scripts.
+
+import os
+import sys
+import time
+import statistics
+
+# Make the backend modules importable when run as `python -m benchmarks.<name>`
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+
+def time_call(fn, repeat=5, warmup=1):
+    """Runs fn repeatedly and returns the median wall-clock time in seconds."""
+    for _ in range(warmup):
+        fn()
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings)
+
+
+def rss_bytes():
+    """Current resident set size of this process (Linux), or peak RSS elsewhere."""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    import resource
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is bytes on macOS and kilobytes on Linux
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def format_bytes(n):
+    for unit in ("B", "KB", "MB", "GB"):
+        if abs(n) < 1024 or unit == "GB":
+            return f"{n:.1f} {unit}"
+        n /= 1024
+
+
+def print_table(headers, rows):
+    widths = [max(len(str(h)), *(len(str(r[i])) for r in rows)) for i, h in enumerate(headers)]
+    print("  ".join(str(h).ljust(w) for h, w in zip(headers, widths)))
+    print("  ".join("-" * w for w in widths))
+    for row in rows:
+        print("  ".join(str(c).ljust(w) for c, w in zip(row, widths)))
+
+
+def wait_for_http(url, timeout=20.0):
+    """Polls `url` until a server answers (any status); raises RuntimeError after `timeout` seconds."""
+    import httpx
+
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            httpx.get(url, timeout=0.5)
+            return
+        except httpx.TransportError:
+            if time.monotonic() > deadline:
+                raise RuntimeError(f"No server answering at {url}")
+            time.sleep(0.1)
+
+
+def load_site_split(site_no):
+    """Loads a site the same way main.py does and returns (X_train, X_test, y_train, y_test)."""
+    import pandas as pd
+    from sklearn.model_selection import train_test_split
+    import DataParse
+
+    train_df, unseen_df = DataParse.load_site_data(site_no)
+    historical_df = pd.concat([train_df, unseen_df.drop(columns=['O3_target', 'NO2_target'], errors='ignore')], ignore_index=True)
+    historical_df = DataParse.create_timestamp_index(historical_df)
+    X, y, _ = DataParse.preprocess_data(historical_df.reset_index())
+    return train_test_split(X, y, test_size=0.2, random_state=42, shuffle=False)
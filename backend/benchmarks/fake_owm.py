@@ -0,0 +1,72 @@
+## Local stand-in for the OpenWeatherMap air pollution API, with configurable latency and error rate.
+## In process: AQIClient(..., transport=httpx.ASGITransport(app=create_app(...)))
+## Standalone: python -m benchmarks.fake_owm --port 9001 --latency 0.2 --error-rate 0.05
+##             then start the API with OWM_URL=http://127.0.0.1:9001/data/2.5/air_pollution
+
+import argparse
+import asyncio
+import random
+import time
+
+from fastapi import FastAPI, HTTPException
+
+
+class UpstreamStats:
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.concurrent = 0
+        self.max_concurrent = 0
+
+
+def create_app(latency=0.05, jitter=0.0, error_rate=0.0, seed=None):
+    """
+    Builds the stub. Every call sleeps `latency` (+ up to `jitter`) seconds and
+    fails with a 503 with probability `error_rate`. Readings are derived from the
+    coordinates, so the same location always gets the same answer.
+    """
+    app = FastAPI(title="Fake OpenWeatherMap")
+    app.state.stats = UpstreamStats()
+    rng = random.Random(seed)
+
+    @app.get("/data/2.5/air_pollution")
+    async def air_pollution(lat: float, lon: float, appid: str = ""):
+        stats = app.state.stats
+        stats.calls += 1
+        stats.concurrent += 1
+        stats.max_concurrent = max(stats.max_concurrent, stats.concurrent)
+        try:
+            await asyncio.sleep(latency + rng.uniform(0, jitter))
+            if rng.random() < error_rate:
+                stats.errors += 1
+                raise HTTPException(status_code=503, detail="Fake upstream error")
+        finally:
+            stats.concurrent -= 1
+
+        level = int(abs(lat * 7 + lon * 3)) % 5 + 1
+        return {
+            "coord": {"lat": lat, "lon": lon},
+            "list": [{
+                "main": {"aqi": level},
+                "components": {"pm2_5": 12.0 * level, "pm10": 20.0 * level, "o3": 15.0 * level, "no2": 10.0 * level},
+                "dt": int(time.time())
+            }]
+        }
+
+    @app.get("/stats")
+    async def get_stats():
+        return vars(app.state.stats)
+
+    return app
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fake OpenWeatherMap air pollution API")
+    parser.add_argument("--port", type=int, default=9001)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--jitter", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    args = parser.parse_args()
+
+    import uvicorn
+    uvicorn.run(create_app(args.latency, args.jitter, args.error_rate), host="127.0.0.1", port=args.port)
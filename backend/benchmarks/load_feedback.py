@@ -0,0 +1,77 @@
+## Load test for POST /api/feedback: concurrent clients against the app in-process, on a scratch database.
+## Compares the group-committing writer with one commit per submission (--max-batch 1).
+## Usage: python -m benchmarks.load_feedback [--clients 64] [--seconds 5]
+
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+
+from benchmarks.common import print_table
+
+import httpx
+import numpy as np
+
+# Point the app at a scratch database before it is imported
+_TMP_DIR = tempfile.TemporaryDirectory()
+os.environ["FEEDBACK_DB_PATH"] = os.path.join(_TMP_DIR.name, "feedback.db")
+
+import app as api  # noqa: E402
+from feedback_db import FeedbackWriter  # noqa: E402
+
+
+async def run_load(clients, seconds):
+    latencies = []
+    errors = 0
+    deadline = time.perf_counter() + seconds
+
+    async def client_loop(client, n):
+        nonlocal errors
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            r = await client.post("/api/feedback", json={"site": n % 7 + 1, "feeling": "smoky"})
+            latencies.append(time.perf_counter() - start)
+            if r.status_code != 200:
+                errors += 1
+
+    transport = httpx.ASGITransport(app=api.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        started = time.perf_counter()
+        await asyncio.gather(*(client_loop(client, n) for n in range(clients)))
+        elapsed = time.perf_counter() - started
+    await api.feedback_writer.close()
+    return np.array(latencies) * 1000, errors, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Feedback submission load test")
+    parser.add_argument("--clients", type=int, default=64)
+    parser.add_argument("--seconds", type=float, default=5)
+    parser.add_argument("--synchronous", default="FULL", help="SQLite synchronous pragma")
+    args = parser.parse_args()
+
+    rows = []
+    for label, max_batch in (("one commit per POST", 1), ("group commit", 500)):
+        api.feedback_db.synchronous = args.synchronous
+        api.feedback_writer = FeedbackWriter(api.feedback_db, max_batch=max_batch)
+        before = api.feedback_db.count()
+        latencies, errors, elapsed = asyncio.run(run_load(args.clients, args.seconds))
+        stored = api.feedback_db.count() - before
+        stats = api.feedback_writer.stats()
+        rows.append([
+            label, stored, f"{stored / elapsed:,.0f}",
+            f"{np.percentile(latencies, 50):.1f} ms", f"{np.percentile(latencies, 95):.1f} ms",
+            f"{stats['mean_batch_rows']:.1f}", errors
+        ])
+
+    # IDs handed out by the database must be unique and increasing
+    ids = [e['id'] for e in api.feedback_db.rows_after(0)]
+    assert ids == sorted(set(ids)), "feedback IDs are not unique and increasing"
+
+    print(f"{args.clients} concurrent clients, {args.seconds:g}s per run, synchronous={args.synchronous}\n")
+    print_table(["writer", "stored", "submissions/s", "p50", "p95", "rows/commit", "errors"], rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,286 @@
+## Load test of the API at many concurrent users, with the fake OpenWeatherMap (benchmarks/fake_owm.py) upstream.
+## Boots the fake upstream and the API (uvicorn) as separate processes, drives a dashboard-like mix of forecast,
+## metrics, feedback, health and live-AQI calls from N virtual users, and reports throughput and latency
+## percentiles per route.
+## Usage: python -m benchmarks.load_test [--users 200] [--duration 30] [--upstream-latency 0.2] [--error-rate 0.02]
+##        python -m benchmarks.load_test --target http://127.0.0.1:8000   (load an API that is already running)
+## The API serves synthetic prediction/metrics files and a temporary feedback database unless --real-data is given.
+## The load generator shares the machine with the server: on few cores, report what the client was able to drive.
+
+import argparse
+import asyncio
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+
+from benchmarks.common import BACKEND_DIR, print_table, wait_for_http
+
+import httpx
+import numpy as np
+
+SITES = list(range(1, 8))
+HORIZONS = [24, 48, 168]
+FEELINGS = ["fresh", "smoky", "dusty", "normal"]
+AGE_GROUPS = ["child", "adult", "elderly", "teen"]
+CONDITIONS = ["asthma", "heart_disease", "respiratory", "diabetes", "allergies"]
+
+
+class VirtualUser:
+    """A dashboard user: one site at a time, and a browser-like ETag cache for conditional GETs."""
+
+    def __init__(self, rng):
+        self.rng = rng
+        self.site = rng.choice(SITES)
+        self.horizon = rng.choice(HORIZONS)
+        self.etags = {}
+
+
+# === REQUEST MIX ===
+# (route label, weight, request builder) - the builder returns (method, url, keyword arguments)
+def _forecast(user):
+    if user.rng.random() < 0.1:
+        # Switched site or horizon in the sidebar
+        user.site = user.rng.choice(SITES)
+        user.horizon = user.rng.choice(HORIZONS)
+    return "GET", f"/api/data/site/{user.site}?horizon={user.horizon}", {}
+
+
+def _forecast_chart(user):
+    return "GET", f"/api/data/site/{user.site}?horizon=168&points=100&pollutant={user.rng.choice(['O3', 'NO2'])}", {}
+
+
+def _metrics(user):
+    return "GET", f"/api/metrics/site/{user.site}?pollutant={user.rng.choice(['O3', 'NO2'])}", {}
+
+
+def _metrics_all(user):
+    return "GET", "/api/metrics/all", {}
+
+
+def _aqi_site(user):
+    return "GET", f"/api/aqi/current?site={user.site}", {}
+
+
+def _aqi_location(user):
+    # A user's own location somewhere around Delhi: mostly cache misses upstream
+    lat = round(28.4 + user.rng.random() * 0.5, 4)
+    lon = round(76.9 + user.rng.random() * 0.6, 4)
+    return "GET", f"/api/aqi/current?lat={lat}&lon={lon}", {}
+
+
+def _feedback_list(user):
+    return "GET", f"/api/feedback?site={user.site}&limit=20", {}
+
+
+def _feedback_summary(user):
+    return "GET", f"/api/feedback/summary?site={user.site}", {}
+
+
+def _feedback_post(user):
+    return "POST", "/api/feedback", {"json": {"site": user.site, "feeling": user.rng.choice(FEELINGS)}}
+
+
+def _health(user):
+    profile = {"age_group": user.rng.choice(AGE_GROUPS),
+               "conditions": user.rng.sample(CONDITIONS, user.rng.randint(0, 2))}
+    return "POST", "/api/health-recommendations", {"json": {"aqi": user.rng.randint(0, 450), "profile": profile}}
+
+
+MIX = [
+    ("GET /api/data/site/{id}", 30, _forecast),
+    ("GET /api/data/site/{id}?points", 5, _forecast_chart),
+    ("GET /api/metrics/site/{id}", 12, _metrics),
+    ("GET /api/metrics/all", 3, _metrics_all),
+    ("GET /api/aqi/current?site", 15, _aqi_site),
+    ("GET /api/aqi/current?lat&lon", 5, _aqi_location),
+    ("GET /api/feedback", 10, _feedback_list),
+    ("GET /api/feedback/summary", 5, _feedback_summary),
+    ("POST /api/feedback", 5, _feedback_post),
+    ("POST /api/health-recommendations", 10, _health),
+]
+
+
+class RouteStats:
+    def __init__(self):
+        self.latencies = []
+        self.not_modified = 0
+        self.errors = defaultdict(int)
+
+
+async def user_loop(client, user, stats, deadline, think):
+    labels = [label for label, _, _ in MIX]
+    weights = [weight for _, weight, _ in MIX]
+    builders = {label: build for label, _, build in MIX}
+    while time.monotonic() < deadline:
+        label = user.rng.choices(labels, weights)[0]
+        method, url, kwargs = builders[label](user)
+        headers = {}
+        if method == "GET" and url in user.etags:
+            headers["If-None-Match"] = user.etags[url]
+
+        route = stats[label]
+        start = time.perf_counter()
+        try:
+            response = await client.request(method, url, headers=headers, **kwargs)
+            elapsed = time.perf_counter() - start
+            if response.status_code == 304:
+                route.not_modified += 1
+            elif response.status_code >= 400:
+                route.errors[str(response.status_code)] += 1
+            if "etag" in response.headers:
+                user.etags[url] = response.headers["etag"]
+            route.latencies.append(elapsed)
+        except httpx.HTTPError as e:
+            route.errors[type(e).__name__] += 1
+
+        # Think time between clicks/polls, cut short at the end of the run
+        pause = user.rng.expovariate(1 / think) if think > 0 else 0
+        await asyncio.sleep(max(0.0, min(pause, deadline - time.monotonic())))
+
+
+async def drive(base_url, users, duration, ramp, think, seed):
+    stats = defaultdict(RouteStats)
+    limits = httpx.Limits(max_connections=users, max_keepalive_connections=users)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=30.0) as client:
+        start = time.monotonic()
+        deadline = start + ramp + duration
+
+        async def start_user(i):
+            # Users join evenly over the ramp-up period
+            await asyncio.sleep(ramp * i / users)
+            await user_loop(client, VirtualUser(random.Random(seed * 100_003 + i)), stats, deadline, think)
+
+        await asyncio.gather(*(start_user(i) for i in range(users)))
+        elapsed = time.monotonic() - start
+    return stats, elapsed
+
+
+def report(stats, elapsed):
+    rows = []
+    all_latencies = []
+    total_errors = 0
+    for label, _, _ in MIX:
+        route = stats.get(label)
+        if route is None:
+            continue
+        errors = sum(route.errors.values())
+        total_errors += errors
+        n = len(route.latencies) + sum(v for k, v in route.errors.items() if not k.isdigit())
+        if route.latencies:
+            ms = np.array(route.latencies) * 1000
+            all_latencies.append(ms)
+            p50, p90, p95, p99 = np.percentile(ms, [50, 90, 95, 99])
+            latency = [f"{p50:.1f}", f"{p90:.1f}", f"{p95:.1f}", f"{p99:.1f}", f"{ms.max():.1f}"]
+        else:
+            latency = ["-"] * 5
+        error_text = ", ".join(f"{k}: {v}" for k, v in sorted(route.errors.items())) or "-"
+        rows.append([label, n, f"{n / elapsed:.1f}", route.not_modified, error_text] + latency)
+
+    print_table(["route", "requests", "req/s", "304", "errors", "p50 ms", "p90 ms", "p95 ms", "p99 ms", "max ms"], rows)
+    if all_latencies:
+        ms = np.concatenate(all_latencies)
+        p50, p95, p99 = np.percentile(ms, [50, 95, 99])
+        print(f"\nTotal: {len(ms):,} responses in {elapsed:.1f} s ({len(ms) / elapsed:.1f} req/s), "
+              f"{total_errors} errors; p50 {p50:.1f} ms, p95 {p95:.1f} ms, p99 {p99:.1f} ms")
+
+
+# === SERVERS ===
+def serve(args):
+    """Runs the API in this process against fixture files (used as the --serve child process)."""
+    import uvicorn
+    import app as api
+    from forecast_cache import ForecastCache
+    from metrics_index import MetricsIndex
+
+    if args.fixtures:
+        api.forecast_cache = ForecastCache(os.path.join(args.fixtures, "predictions"))
+        api.metrics_index = MetricsIndex(os.path.join(args.fixtures, "metrics"))
+    uvicorn.run(api.app, host="127.0.0.1", port=args.api_port, log_level="warning", access_log=False)
+
+
+def start_servers(args, tmp):
+    upstream = f"http://127.0.0.1:{args.upstream_port}"
+    env = dict(os.environ,
+               OWM_URL=f"{upstream}/data/2.5/air_pollution",
+               OWM_API_KEY="load-test",
+               FEEDBACK_DB_PATH=os.path.join(tmp, "feedback.db"),
+               AQI_REFRESH="1" if args.refresh else "0")
+
+    command = [sys.executable, "-m", "benchmarks.load_test", "--serve", "--api-port", str(args.api_port)]
+    if not args.real_data:
+        # Imported here: suite imports pandas/sklearn, which the load generator itself does not need
+        from benchmarks.suite import write_fixtures
+        write_fixtures(tmp)
+        command += ["--fixtures", tmp]
+
+    processes = [
+        subprocess.Popen([sys.executable, "-m", "benchmarks.fake_owm", "--port", str(args.upstream_port),
+                          "--latency", str(args.upstream_latency), "--jitter", str(args.upstream_jitter),
+                          "--error-rate", str(args.error_rate)],
+                         cwd=BACKEND_DIR, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL),
+        subprocess.Popen(command, cwd=BACKEND_DIR, env=env, stdout=subprocess.DEVNULL)
+    ]
+    wait_for_http(f"{upstream}/stats")
+    wait_for_http(f"http://127.0.0.1:{args.api_port}/", timeout=60.0)
+    return processes, upstream
+
+
+def main():
+    parser = argparse.ArgumentParser(description="API load test with a fake OpenWeatherMap upstream")
+    parser.add_argument("--users", type=int, default=200, help="Concurrent virtual users")
+    parser.add_argument("--duration", type=float, default=30, help="Seconds of full load after the ramp-up")
+    parser.add_argument("--ramp", type=float, default=5, help="Seconds over which the users join")
+    parser.add_argument("--think", type=float, default=1.0, help="Mean think time between a user's requests (s)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--upstream-latency", type=float, default=0.2)
+    parser.add_argument("--upstream-jitter", type=float, default=0.1)
+    parser.add_argument("--error-rate", type=float, default=0.02, help="Fraction of upstream calls that fail")
+    parser.add_argument("--no-refresh", dest="refresh", action="store_false",
+                        help="Turn off the API's background AQI refresh")
+    parser.add_argument("--real-data", action="store_true",
+                        help="Serve backend/predictions and backend/metrics instead of synthetic files")
+    parser.add_argument("--target", help="Load an API that is already running at this URL instead of booting one")
+    parser.add_argument("--api-port", type=int, default=8765)
+    parser.add_argument("--upstream-port", type=int, default=9765)
+    # Internal: run the API server (child process started by the load test)
+    parser.add_argument("--serve", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--fixtures", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        serve(args)
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        processes, upstream = [], None
+        base_url = args.target
+        try:
+            if base_url is None:
+                print("⏳ Starting the fake upstream and the API...")
+                processes, upstream = start_servers(args, tmp)
+                base_url = f"http://127.0.0.1:{args.api_port}"
+
+            print(f"🚀 {args.users} users for {args.duration:.0f} s (+{args.ramp:.0f} s ramp-up), "
+                  f"mean think time {args.think} s, against {base_url}\n")
+            stats, elapsed = asyncio.run(drive(base_url, args.users, args.duration, args.ramp, args.think, args.seed))
+            report(stats, elapsed)
+
+            if upstream is not None:
+                upstream_stats = httpx.get(f"{upstream}/stats").json()
+                aqi_stats = httpx.get(f"{base_url}/api/aqi/stats").json()
+                print(f"Upstream: {upstream_stats['calls']} calls ({upstream_stats['errors']} failed), "
+                      f"max {upstream_stats['max_concurrent']} concurrent. "
+                      f"AQI client: {aqi_stats['client']}")
+        finally:
+            for process in processes:
+                process.terminate()
+            for process in processes:
+                process.wait()
+
+
+if __name__ == "__main__":
+    main()
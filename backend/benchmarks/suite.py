@@ -0,0 +1,326 @@
+## Benchmark suite for the pipeline and API hot paths, with a stored baseline and a regression check.
+## Usage (from backend/):
+##   python -m benchmarks.suite                  run every case and compare against benchmarks/baseline.json
+##   python -m benchmarks.suite --save           run and store the results as the new baseline
+##   python -m benchmarks.suite --only api/ --threshold 0.3
+## Exits with status 1 when a case is slower than its baseline by more than the threshold.
+## The API cases run against synthetic prediction/metrics files and a temporary feedback database,
+## so the results do not depend on what main.py last wrote.
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+from benchmarks.common import print_table
+from benchmarks.bench_columnar import make_frame
+
+import numpy as np
+import pandas as pd
+from sklearn.model_selection import train_test_split
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+# Boosting rounds for the training case; enough to exercise the code path in a few seconds
+TRAIN_ROUNDS = 50
+# Forecast hours in the synthetic prediction files (30 days)
+FIXTURE_HOURS = 24 * 30
+# Cases are compared on their fastest run, which is far less sensitive to other load on the
+# machine than the median. Slowdowns smaller than this many seconds are noise, whatever the ratio
+MIN_REGRESSION_SECONDS = 0.0005
+
+
+class Case:
+    """One benchmark: `run(arg)` is timed; `setup()` (untimed) builds a fresh argument for every run."""
+
+    def __init__(self, name, run, setup=None, repeat=20):
+        self.name = name
+        self.run = run
+        self.setup = setup
+        self.repeat = repeat
+
+
+def measure(case, repeat=None, warmup=1):
+    """Returns {"median": s, "min": s, "runs": n} for a case."""
+    runs = repeat or case.repeat
+    timings = []
+    for i in range(warmup + runs):
+        arg = case.setup() if case.setup else None
+        start = time.perf_counter()
+        case.run(arg)
+        elapsed = time.perf_counter() - start
+        if i >= warmup:
+            timings.append(elapsed)
+    return {"median": statistics.median(timings), "min": min(timings), "runs": runs}
+
+
+def _calibration_work():
+    values = np.random.default_rng(0).normal(size=200_000)
+    total = 0
+    for i in range(100_000):
+        total += i * i
+    np.sort(values)
+    return total + float((values * values).sum())
+
+
+def calibrate(repeat=15):
+    """
+    Times a fixed Python + numpy workload. Comparing it with the baseline's calibration tells how much
+    faster or slower the machine is running right now, and the regression check divides that out.
+    """
+    return measure(Case("calibration", lambda _: _calibration_work()), repeat=repeat)["min"]
+
+
+@contextlib.contextmanager
+def quiet():
+    # The pipeline functions report progress with prints
+    with contextlib.redirect_stdout(io.StringIO()):
+        yield
+
+
+# === PIPELINE CASES ===
+def pipeline_cases(site_no):
+    import DataParse
+    import data_modeling
+    import main as pipeline
+
+    train_df, unseen_df = DataParse.load_site_data(site_no)
+    historical_df = pd.concat([train_df, unseen_df.drop(columns=['O3_target', 'NO2_target'], errors='ignore')],
+                              ignore_index=True)
+    indexed_df = DataParse.create_timestamp_index(historical_df.copy())
+    X, y, _ = DataParse.preprocess_data(indexed_df.reset_index())
+    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42, shuffle=False)
+
+    def train(_):
+        with quiet():
+            return data_modeling.train_xgboost_models(X_train, y_train, X_test, y_test, n_estimators=TRAIN_ROUNDS)
+
+    models, _ = train(None)
+
+    def predict(_):
+        with quiet():
+            data_modeling.predict(models, X_test)
+
+    return [
+        Case("pipeline/load_site_data", lambda _: DataParse.load_site_data(site_no), repeat=5),
+        Case("pipeline/load_site_data(fast)", lambda _: DataParse.load_site_data(site_no, fast=True)),
+        Case("pipeline/create_timestamp_index", DataParse.create_timestamp_index, setup=historical_df.copy),
+        Case("pipeline/preprocess_data", lambda _: DataParse.preprocess_data(indexed_df.reset_index())),
+        Case("pipeline/preprocess_data(compact)",
+             lambda _: DataParse.preprocess_data(indexed_df.reset_index(), compact=True)),
+        Case(f"pipeline/train_xgboost_models({TRAIN_ROUNDS} rounds)", train, repeat=3),
+        Case("pipeline/predict", predict),
+        Case("pipeline/generate_future_features(168h)",
+             lambda _: pipeline.generate_future_features(indexed_df, 168, seed=0)),
+        Case("pipeline/generate_future_features(8760h)",
+             lambda _: pipeline.generate_future_features(indexed_df, 8760, seed=0), repeat=5),
+    ]
+
+
+# === API CASES ===
+def write_fixtures(root):
+    """Synthetic prediction files (CSV + bundle) and metrics files for sites 1-7."""
+    import prediction_store
+
+    predictions_dir = os.path.join(root, "predictions")
+    metrics_dir = os.path.join(root, "metrics")
+    os.makedirs(predictions_dir)
+    os.makedirs(metrics_dir)
+    for site_id in range(1, 8):
+        df = make_frame(FIXTURE_HOURS).drop(columns=['timestamp'])
+        csv_path = os.path.join(predictions_dir, f"predictions_site_{site_id}.csv")
+        df.to_csv(csv_path, index=False)
+        prediction_store.write_prediction_bundle(df, csv_path)
+
+        metrics = {
+            target: {"RMSE": 15.0 + site_id, "R2": 0.7, "RIA": 0.75, "MAE": 10.0, "Bias": 0.5}
+            for target in ("O3_target", "NO2_target")
+        }
+        with open(os.path.join(metrics_dir, f"metrics_site_{site_id}.json"), 'w') as f:
+            json.dump(metrics, f, indent=4)
+    return predictions_dir, metrics_dir
+
+
+def api_cases(stack):
+    """Boots the app in-process (startup/shutdown included) against the fixtures; returns the cases."""
+    root = stack.enter_context(tempfile.TemporaryDirectory())
+    predictions_dir, metrics_dir = write_fixtures(root)
+    os.environ["FEEDBACK_DB_PATH"] = os.path.join(root, "feedback.db")
+    os.environ["AQI_REFRESH"] = "0"
+
+    from fastapi.testclient import TestClient
+    # Imported only now: importing the app opens the feedback database named above
+    import app as api
+    from benchmarks.bench_health_batch import make_items
+    from forecast_cache import ForecastCache
+    from metrics_index import MetricsIndex
+
+    api.forecast_cache = ForecastCache(predictions_dir)
+    api.metrics_index = MetricsIndex(metrics_dir)
+    with quiet():
+        client = stack.enter_context(TestClient(api.app))
+
+    etag = client.get("/api/data/site/1").headers["etag"]
+    health_item = make_items(1)[0]
+    health_batch = {"items": make_items(1000)}
+
+    def get(url, **kwargs):
+        def run(_):
+            r = client.get(url, **kwargs)
+            assert r.status_code in (200, 304), (url, r.status_code)
+        return run
+
+    def post(url, body):
+        def run(_):
+            r = client.post(url, json=body)
+            assert r.status_code == 200, (url, r.status_code)
+        return run
+
+    return [
+        Case("api/GET /api/data/site/1", get("/api/data/site/1")),
+        Case("api/GET /api/data/site/1 (If-None-Match)", get("/api/data/site/1", headers={"If-None-Match": etag})),
+        Case("api/GET /api/data/site/1?horizon=720&format=columnar",
+             get(f"/api/data/site/1?horizon={FIXTURE_HOURS}&format=columnar")),
+        Case("api/GET /api/data/site/1?start=...&limit=168", get("/api/data/site/1?start=2025-10-20&limit=168")),
+        Case("api/GET /api/data/site/1?horizon=720&points=200",
+             get(f"/api/data/site/1?horizon={FIXTURE_HOURS}&points=200")),
+        Case("api/GET /api/data/sites", get("/api/data/sites")),
+        Case("api/GET /api/metrics/all", get("/api/metrics/all")),
+        Case("api/GET /api/metrics/site/1", get("/api/metrics/site/1?pollutant=NO2")),
+        Case("api/POST /api/health-recommendations", post("/api/health-recommendations", health_item)),
+        Case("api/POST /api/health-recommendations/batch (1000)",
+             post("/api/health-recommendations/batch", health_batch), repeat=5),
+        Case("api/POST /api/feedback", post("/api/feedback", {"site": 1, "feeling": "smoky"})),
+        Case("api/GET /api/feedback?site=1", get("/api/feedback?site=1&limit=50")),
+        Case("api/GET /api/feedback/summary", get("/api/feedback/summary?window_minutes=60")),
+    ]
+
+
+# === BASELINE ===
+def machine_info():
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "processor": platform.processor() or platform.machine(),
+        "cpus": os.cpu_count(),
+    }
+
+
+def load_baseline(path):
+    if not os.path.exists(path):
+        return None
+    with open(path, 'r') as f:
+        return json.load(f)
+
+
+def save_baseline(path, results, calibration, merge_into=None):
+    cases = dict(merge_into["cases"]) if merge_into else {}
+    cases.update(results)
+    baseline = {
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "machine": machine_info(),
+        "calibration": calibration,
+        "cases": cases
+    }
+    with open(path, 'w') as f:
+        json.dump(baseline, f, indent=4)
+
+
+def compare(results, baseline, threshold, speed=1.0):
+    """
+    Returns (table rows, names of the regressed cases).
+    `speed` is this run's calibration over the baseline's: every baseline time is scaled by it first.
+    """
+    rows, regressed = [], []
+    for name, result in results.items():
+        best = f"{result['min'] * 1000:.2f} ms"
+        median = f"{result['median'] * 1000:.2f} ms"
+        base = (baseline or {}).get("cases", {}).get(name)
+        if base is None:
+            rows.append([name, best, median, "-", "-", "new"])
+            continue
+        expected = base["min"] * speed
+        ratio = result["min"] / expected
+        status = "ok"
+        if ratio > 1 + threshold and result["min"] - expected > MIN_REGRESSION_SECONDS:
+            status = "REGRESSION"
+            regressed.append(name)
+        elif ratio < 1 - threshold:
+            status = "faster"
+        rows.append([name, best, median, f"{expected * 1000:.2f} ms", f"{(ratio - 1) * 100:+.0f}%", status])
+    return rows, regressed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pipeline and API benchmark suite")
+    parser.add_argument("--only", nargs="*", default=[], help="Run only cases whose name contains one of these")
+    parser.add_argument("--site", type=int, default=1, help="Site whose data the pipeline cases use")
+    parser.add_argument("--repeat", type=int, default=None, help="Override every case's repeat count")
+    parser.add_argument("--threshold", type=float, default=0.5,
+                        help="Flag a case slower than baseline by more than this fraction (default 0.5)")
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--save", action="store_true", help="Store these results as the baseline")
+    args = parser.parse_args()
+
+    def wanted(group):
+        # A filter naming the other group explicitly skips this group's (slow) setup
+        return not args.only or any(o.startswith(group) or not o.startswith(("pipeline/", "api/"))
+                                    for o in args.only)
+
+    calibration = calibrate()
+    results = {}
+    with contextlib.ExitStack() as stack:
+        cases = []
+        if wanted("pipeline/"):
+            print("⏳ Preparing pipeline cases (loads the site data and trains a small model)...")
+            cases += pipeline_cases(args.site)
+        if wanted("api/"):
+            cases += api_cases(stack)
+        cases = [c for c in cases if not args.only or any(o in c.name for o in args.only)]
+
+        for case in cases:
+            results[case.name] = measure(case, args.repeat)
+            print(f"  {case.name}: {results[case.name]['min'] * 1000:.2f} ms")
+    # Calibrate on both sides of the run, the machine's speed can drift while it goes
+    calibration = min(calibration, calibrate())
+
+    baseline = load_baseline(args.baseline)
+    speed = 1.0
+    if baseline is not None and baseline.get("machine") != machine_info():
+        print(f"\n⚠️ Baseline was recorded on a different machine ({baseline['machine']}); "
+              f"compare with care or re-run with --save.")
+    if baseline is not None and baseline.get("calibration"):
+        speed = calibration / baseline["calibration"]
+        print(f"\nMachine speed vs baseline: calibration {calibration * 1000:.2f} ms "
+              f"vs {baseline['calibration'] * 1000:.2f} ms; baseline times scaled by {speed:.2f}")
+
+    rows, regressed = compare(results, baseline, args.threshold, speed)
+    print()
+    print_table(["case", "best", "median", "expected (baseline)", "change", "status"], rows)
+
+    if args.save:
+        # Cases not run this time keep their stored numbers
+        save_baseline(args.baseline, results, calibration, merge_into=baseline)
+        print(f"\n💾 Baseline saved to {args.baseline}")
+        return 0
+
+    if regressed:
+        print(f"\n❌ {len(regressed)} case(s) slower than baseline by more than {args.threshold:.0%}:")
+        for name in regressed:
+            print(f"   {name}")
+        return 1
+    if baseline is None:
+        print(f"\nNo baseline at {args.baseline}; run with --save to create one.")
+    else:
+        print(f"\n✅ No case slower than baseline by more than {args.threshold:.0%}.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
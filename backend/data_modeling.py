@@ -45,11 +45,102 @@ def calculate_metrics(y_true, y_pred):
         "MAE": mean_absolute_error(y_true, y_pred),
         "Bias": np.mean(y_pred - y_true) # Mean Error
     }
-    return metrics
+    # Plain floats keep the metrics JSON-serializable when inputs are float32
+    return {name: float(value) for name, value in metrics.items()}
+
+# === SHARED XGBOOST HELPERS ===
+def _build_regressor(n_estimators=5000, n_jobs=-1, **overrides):
+    """Creates an XGBRegressor with the tuned hyperparameters used for every site."""
+    # === A MORE BALANCED AND FASTER CONFIGURATION ===
+    params = dict(
+        # Reduced estimators, but increased learning rate to compensate
+        n_estimators=n_estimators,
+        learning_rate=0.03,
+        max_depth=7,
+        min_child_weight=3,
+        subsample=0.85,
+        colsample_bytree=0.9,
+        reg_lambda=1.2,
+        reg_alpha=0.0,
+        gamma=0.0,
+        objective="reg:squarederror",
+        eval_metric="rmse",
+        tree_method="hist",
+        grow_policy="lossguide",
+        random_state=42,
+        n_jobs=n_jobs,  # -1 uses all available CPU cores
+    )
+    params.update(overrides)
+    return XGBRegressor(**params)
+
+
+def _fit_with_early_stopping(model, X_tr, y_tr, X_val, y_val, early_stopping_rounds=50):
+    """Fits a model with early stopping on the validation set, across xgboost API versions."""
+    # Early stopping is now even MORE important. Let's make it more sensitive.
+    # Stop after 50 rounds of no improvement instead of 100.
+    fit_base = dict(
+        X=X_tr,
+        y=y_tr,
+        eval_set=[(X_val, y_val)],
+        verbose=False,
+    )
+    # Attempt 1: callbacks API
+    try:
+        from xgboost.callback import EarlyStopping
+        model.fit(**fit_base, callbacks=[EarlyStopping(rounds=early_stopping_rounds, save_best=True)])
+        return model
+    except (ImportError, TypeError):
+        pass
+
+    # Attempt 2: early_stopping_rounds kw (older API)
+    try:
+        model.fit(**fit_base, early_stopping_rounds=early_stopping_rounds)
+        return model
+    except TypeError:
+        pass
+
+    # Attempt 3: no early stopping
+    model.fit(**fit_base)
+    return model
+
+
+def _best_iteration(model):
+    return getattr(model, "best_iteration_", getattr(model, "best_iteration", None))
+
+
+def _predict_with_best(model, X):
+    """Predicts using the best iteration found during early stopping, if available across versions."""
+    best_iter = _best_iteration(model)
+    try:
+        if best_iter is not None:
+            return model.predict(X, iteration_range=(0, best_iter + 1))
+        return model.predict(X)
+    except TypeError:
+        # Fallback for older xgboost versions
+        best_ntree = getattr(model, "best_ntree_limit", None)
+        if best_ntree is not None:
+            return model.predict(X, ntree_limit=best_ntree)
+        return model.predict(X)
+
+
+def _report_metrics(target, test_metrics, best_iter):
+    print(f"✅ Test Set Performance for {target}:")
+    if best_iter is not None:
+        print(f"   Best iteration: {best_iter}")
+    print(
+        f"   RMSE={test_metrics['RMSE']:.3f}, R²={test_metrics['R2']:.3f}, RIA={test_metrics['RIA']:.3f}, MAE={test_metrics['MAE']:.3f}, Bias={test_metrics['Bias']:.3f}"
+    )
 
 # === TRAIN TWO MODELS: O3_target and NO2_target ===
-def train_xgboost_models(X_train, y_train, X_test, y_test):
-    """Trains an XGBoost regressor for each target column with early stopping and tuned hyperparameters."""
+def train_xgboost_models(X_train, y_train, X_test, y_test, n_jobs=-1, multi_output=False, n_estimators=5000):
+    """
+    Trains an XGBoost regressor for each target column with early stopping and tuned hyperparameters.
+    n_jobs is the number of xgboost threads per model (-1 = all cores).
+    With multi_output=True a single model predicts every target (see train_xgboost_multioutput).
+    """
+    if multi_output:
+        return train_xgboost_multioutput(X_train, y_train, X_test, y_test, n_jobs=n_jobs, n_estimators=n_estimators)
+
     results = {}
     models = {}
 
@@ -59,111 +150,108 @@ def train_xgboost_models(X_train, y_train, X_test, y_test):
         # Split a small validation set from the training data for early stopping (no leakage from test)
         X_tr, X_val, y_tr, y_val = sk_split(X_train, y_train[target], test_size=0.1, random_state=42)
 
-               # === A MORE BALANCED AND FASTER CONFIGURATION ===
-        model = XGBRegressor(
-            # Reduced estimators, but increased learning rate to compensate
-            n_estimators=5000,
-            learning_rate=0.03,
-            max_depth=7,
-            min_child_weight=3,
-            subsample=0.85,
-            colsample_bytree=0.9,
-            reg_lambda=1.2,
-            reg_alpha=0.0,
-            gamma=0.0,
-            objective="reg:squarederror",
-            eval_metric="rmse",
-            tree_method="hist",
-            grow_policy="lossguide",
-            random_state=42,
-            n_jobs=-1,      # Use all available CPU cores
-        )
-
-        # Early stopping is now even MORE important. Let's make it more sensitive.
-        # Stop after 50 rounds of no improvement instead of 100.
-        early_stopping_rounds = 50
-
-        # --- The rest of your fitting logic can use this `early_stopping_rounds` variable ---
-        fit_base = dict(
-            X=X_tr,
-            y=y_tr,
-            eval_set=[(X_val, y_val)],
-            verbose=False,
-        )
-        fit_done = False
-        # Attempt 1: callbacks API
-        try:
-            from xgboost.callback import EarlyStopping
-            model.fit(**fit_base, callbacks=[EarlyStopping(rounds=early_stopping_rounds, save_best=True)])
-            fit_done = True
-        except (ImportError, TypeError):
-             fit_done = False
-
-        # Attempt 2: early_stopping_rounds kw (older API)
-        if not fit_done:
-            try:
-                model.fit(**fit_base, early_stopping_rounds=early_stopping_rounds)
-                fit_done = True
-            except TypeError:
-                fit_done = False
-        # ... (rest of your fitting code) ...
-
-        # Attempt 3: no early stopping
-        if not fit_done:
-            model.fit(**fit_base)
+        model = _build_regressor(n_estimators=n_estimators, n_jobs=n_jobs)
+        _fit_with_early_stopping(model, X_tr, y_tr, X_val, y_val)
 
         # Use the best iteration found during early stopping when predicting
-        # Predict using discovered best iteration if available across versions
-        best_iter = getattr(model, "best_iteration_", getattr(model, "best_iteration", None))
-        try:
-            if best_iter is not None:
-                y_pred = model.predict(X_test, iteration_range=(0, best_iter + 1))
-            else:
-                y_pred = model.predict(X_test)
-        except TypeError:
-            # Fallback for older xgboost versions
-            best_ntree = getattr(model, "best_ntree_limit", None)
-            if best_ntree is not None:
-                y_pred = model.predict(X_test, ntree_limit=best_ntree)
-            else:
-                y_pred = model.predict(X_test)
+        y_pred = _predict_with_best(model, X_test)
 
         # --- METRICS (using centralized function) ---
         test_metrics = calculate_metrics(y_test[target], y_pred)
         results[target] = test_metrics
         models[target] = model
 
-        best_iter = getattr(model, "best_iteration_", getattr(model, "best_iteration", None))
-        print(f"✅ Test Set Performance for {target}:")
-        if best_iter is not None:
-            print(f"   Best iteration: {best_iter}")
-        print(
-            f"   RMSE={test_metrics['RMSE']:.3f}, R²={test_metrics['R2']:.3f}, RIA={test_metrics['RIA']:.3f}, MAE={test_metrics['MAE']:.3f}, Bias={test_metrics['Bias']:.3f}"
-        )
+        _report_metrics(target, test_metrics, _best_iteration(model))
 
     return models, results
 
+# === TRAIN ONE MODEL FOR ALL TARGETS ===
+def train_xgboost_multioutput(X_train, y_train, X_test, y_test, n_jobs=-1, n_estimators=5000):
+    """
+    Trains a single multi-output XGBoost model (one tree per round predicts every target).
+    Returns the same metrics format as train_xgboost_models; the model is keyed by the tuple of target names.
+    """
+    targets = tuple(y_train.columns)
+    print(f"\n💨 Training one multi-output model for {', '.join(targets)}...")
+
+    X_tr, X_val, y_tr, y_val = sk_split(X_train, y_train, test_size=0.1, random_state=42)
+
+    model = _build_regressor(n_estimators=n_estimators, n_jobs=n_jobs, multi_strategy="multi_output_tree")
+    _fit_with_early_stopping(model, X_tr, y_tr, X_val, y_val)
+
+    y_pred = _predict_with_best(model, X_test).reshape(len(X_test), len(targets))
+
+    results = {}
+    for i, target in enumerate(targets):
+        test_metrics = calculate_metrics(y_test[target], y_pred[:, i])
+        results[target] = test_metrics
+        _report_metrics(target, test_metrics, _best_iteration(model))
+
+    return {targets: model}, results
+
+# === INCREMENTAL (WARM-START) TRAINING ===
+def evaluate_models(models, X, y):
+    """Computes the metrics of already-trained models on (X, y), in the train_xgboost_models format."""
+    predictions = predict(models, X)
+    return {target: calculate_metrics(y[target], predictions[target]) for target in y.columns}
+
+
+def detect_drift(models, X_new, y_new, reference_metrics, threshold=1.5):
+    """
+    Checks whether the models still fit the newly arrived rows.
+    Drift is flagged when any target's RMSE on the new rows exceeds `threshold` times
+    the RMSE recorded for that target at training time.
+    Returns (drifted, new_metrics).
+    """
+    new_metrics = evaluate_models(models, X_new, y_new)
+    drifted = False
+    for target, metrics in new_metrics.items():
+        reference = (reference_metrics or {}).get(target, {}).get("RMSE")
+        if reference is None or np.isnan(metrics["RMSE"]):
+            continue
+        if metrics["RMSE"] > threshold * reference:
+            print(f"⚠️  Drift detected for {target}: RMSE {metrics['RMSE']:.3f} vs {reference:.3f} at training time")
+            drifted = True
+    return drifted, new_metrics
+
+
+def continue_xgboost_models(models, X_new, y_new, extra_rounds=200, n_jobs=-1):
+    """
+    Continues boosting each model on newly arrived rows only, adding `extra_rounds` trees.
+    Works for both per-target and multi-output models; returns a new models dict.
+    """
+    updated = {}
+    for key, model in models.items():
+        y_part = y_new[list(key)] if isinstance(key, tuple) else y_new[key]
+        overrides = {"multi_strategy": "multi_output_tree"} if isinstance(key, tuple) else {}
+
+        # Early stopping truncated the booster to its best iteration; drop that marker
+        # so predictions use the new trees as well
+        booster = model.get_booster().copy()
+        booster.set_attr(best_iteration=None, best_score=None)
+
+        print(f"\n♻️  Adding {extra_rounds} rounds for {key} on {len(y_part)} new rows...")
+        new_model = _build_regressor(n_estimators=extra_rounds, n_jobs=n_jobs, **overrides)
+        new_model.fit(X_new, y_part, xgb_model=booster, verbose=False)
+        updated[key] = new_model
+    return updated
+
 # === PREDICT ON FUTURE/UNSEEN DATA ===
 def predict(models, X_future):
-    """Uses trained models to predict on future or unseen feature data."""
-    
-    def _predict_with_best(m, X):
-        """Internal helper to predict using the best model iteration."""
-        try:
-            # Modern API (XGBoost > 1.6)
-            if hasattr(m, "best_iteration") and m.best_iteration is not None:
-                return m.predict(X, iteration_range=(0, m.best_iteration + 1))
-        except TypeError:
-            # Older API for iteration_range
-            if hasattr(m, "best_ntree_limit"):
-                return m.predict(X, ntree_limit=m.best_ntree_limit)
-        # Fallback for any other case
-        return m.predict(X)
-
+    """
+    Uses trained models to predict on future or unseen feature data.
+    A model keyed by a tuple of targets is a multi-output model and fills every one of them.
+    """
     predictions = {}
     for target, model in models.items():
         preds = _predict_with_best(model, X_future)
-        predictions[target] = preds
-        print(f"🔮 Generated future predictions for {target}.")
+        if isinstance(target, tuple):
+            preds = preds.reshape(len(X_future), len(target))
+            for i, name in enumerate(target):
+                predictions[name] = preds[:, i]
+            print(f"🔮 Generated future predictions for {', '.join(target)}.")
+        else:
+            predictions[target] = preds
+            print(f"🔮 Generated future predictions for {target}.")
 
-    return predictions
\ No newline at end of file
+    return predictions
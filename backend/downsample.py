@@ -0,0 +1,107 @@
+## Time-bucket aggregation and LTTB downsampling of prediction frames for the chart endpoints.
+
+import numpy as np
+import pandas as pd
+
+# Bucket width in seconds for each `resolution`
+RESOLUTIONS = {"hourly": 3600, "3h": 3 * 3600, "daily": 24 * 3600}
+AGGREGATIONS = ("mean", "max")
+# LTTB needs the two end points plus at least one bucket in between
+MIN_POINTS = 3
+
+DATE_COLUMNS = ['year', 'month', 'day', 'hour']
+
+
+def aggregate(frame, resolution, agg="mean"):
+    """
+    Collapses a timestamp-sorted prediction frame into `resolution` buckets (site-local wall time),
+    one row per bucket stamped with the bucket start. Missing values are ignored; a bucket with
+    no value for a column stays NaN.
+    """
+    if len(frame) == 0:
+        return frame
+    step = RESOLUTIONS[resolution]
+
+    timestamps = frame['timestamp'].to_numpy()
+    buckets = timestamps.astype('datetime64[s]').astype(np.int64) // step
+    # The frame is sorted, so every bucket is one run of rows starting where the bucket number changes
+    starts = np.flatnonzero(np.r_[True, buckets[1:] != buckets[:-1]])
+
+    value_columns = [c for c in frame.columns if c not in DATE_COLUMNS and c != 'timestamp']
+    values = frame[value_columns].to_numpy(dtype=np.float64)
+    if agg == "max":
+        # fmax skips NaN unless every value in the bucket is NaN
+        reduced = np.fmax.reduceat(values, starts, axis=0)
+    else:
+        valid = ~np.isnan(values)
+        sums = np.add.reduceat(np.where(valid, values, 0.0), starts, axis=0)
+        counts = np.add.reduceat(valid.astype(np.int64), starts, axis=0)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            reduced = sums / counts
+
+    bucket_start = pd.DatetimeIndex((buckets[starts] * step).astype('datetime64[s]').astype(timestamps.dtype))
+    columns = {
+        'year': bucket_start.year, 'month': bucket_start.month,
+        'day': bucket_start.day, 'hour': bucket_start.hour
+    }
+    data = {}
+    for col in frame.columns:
+        if col in columns:
+            data[col] = columns[col].astype(np.int64)
+        elif col == 'timestamp':
+            data[col] = bucket_start
+        else:
+            data[col] = reduced[:, value_columns.index(col)]
+    return pd.DataFrame(data)
+
+
+def lttb_indices(x, y, points):
+    """
+    Largest-Triangle-Three-Buckets: picks `points` indices of the series (x, y) that keep its visual shape.
+    Always keeps the first and last point. Each bucket's choice depends on the previous one, so the
+    buckets are walked in order; the bucket averages and triangle areas are computed with numpy.
+    """
+    n = len(x)
+    if points >= n or points < MIN_POINTS:
+        return np.arange(n)
+
+    x = np.asarray(x, dtype=np.float64)
+    y = np.nan_to_num(np.asarray(y, dtype=np.float64))
+
+    # points - 2 buckets over the rows between the end points
+    edges = np.linspace(1, n - 1, points - 1).astype(np.int64)
+    sum_x = np.r_[0.0, np.cumsum(x)]
+    sum_y = np.r_[0.0, np.cumsum(y)]
+    sizes = edges[1:] - edges[:-1]
+    avg_x = (sum_x[edges[1:]] - sum_x[edges[:-1]]) / sizes
+    avg_y = (sum_y[edges[1:]] - sum_y[edges[:-1]]) / sizes
+    # The bucket after the last one is the final point itself
+    avg_x = np.r_[avg_x, x[-1]]
+    avg_y = np.r_[avg_y, y[-1]]
+
+    selected = np.empty(points, dtype=np.int64)
+    selected[0] = 0
+    selected[-1] = n - 1
+    a = 0
+    for i in range(points - 2):
+        lo, hi = edges[i], edges[i + 1]
+        cx, cy = avg_x[i + 1], avg_y[i + 1]
+        area = np.abs((x[a] - cx) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (cy - y[a]))
+        a = lo + int(np.argmax(area))
+        selected[i + 1] = a
+    return selected
+
+
+def downsample(frame, column, points):
+    """Keeps at most `points` rows of a timestamp-sorted frame, chosen by LTTB on `column`."""
+    x = frame['timestamp'].to_numpy().astype('datetime64[s]').astype(np.int64)
+    return frame.iloc[lttb_indices(x, frame[column].to_numpy(), points)]
+
+
+def shape_forecast(frame, resolution=None, agg="mean", points=None, column=None):
+    """Aggregates to `resolution` (if given), then LTTB-downsamples on `column` to `points` rows (if given)."""
+    if resolution is not None:
+        frame = aggregate(frame, resolution, agg)
+    if points is not None:
+        frame = downsample(frame, column, points)
+    return frame
@@ -0,0 +1,210 @@
+## Durable SQLite storage for crowdsourced feedback, with a group-committing async writer.
+
+import asyncio
+import sqlite3
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+FEEDBACK_COLUMNS = ("site", "feeling", "description", "timestamp")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS feedback (
+    id          INTEGER PRIMARY KEY AUTOINCREMENT,
+    site        INTEGER NOT NULL,
+    feeling     TEXT NOT NULL,
+    description TEXT,
+    timestamp   TEXT NOT NULL
+)
+"""
+
+
+def _row_to_entry(row):
+    entry = dict(zip(FEEDBACK_COLUMNS, row[1:]))
+    entry['id'] = row[0]
+    return entry
+
+
+class FeedbackDB:
+    """
+    Feedback table in a SQLite database running in WAL mode.
+
+    IDs come from an AUTOINCREMENT key, so they only ever grow, also across
+    restarts and across API worker processes sharing the file. Reads use their
+    own connection and never wait for the writer.
+    """
+
+    def __init__(self, path, synchronous="FULL"):
+        self.path = path
+        self.synchronous = synchronous
+        with self.connect() as conn:
+            conn.execute(_SCHEMA)
+        self._read_conn = self.connect()
+        self._read_lock = threading.Lock()
+
+    def connect(self):
+        conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(f"PRAGMA synchronous={self.synchronous}")
+        return conn
+
+    def insert_many(self, conn, entries):
+        """Inserts entries in one transaction (one fsync) and returns their new IDs in order."""
+        ids = []
+        with conn:
+            for entry in entries:
+                cursor = conn.execute(
+                    "INSERT INTO feedback (site, feeling, description, timestamp) VALUES (?, ?, ?, ?)",
+                    tuple(entry.get(col) for col in FEEDBACK_COLUMNS)
+                )
+                ids.append(cursor.lastrowid)
+        return ids
+
+    def rows_after(self, last_id, limit=None):
+        """Returns the entries with id > last_id, oldest first."""
+        query = "SELECT id, site, feeling, description, timestamp FROM feedback WHERE id > ? ORDER BY id"
+        params = (last_id,)
+        if limit is not None:
+            query += " LIMIT ?"
+            params += (limit,)
+        with self._read_lock:
+            return [_row_to_entry(row) for row in self._read_conn.execute(query, params)]
+
+    def recent(self, limit):
+        """Returns the newest `limit` entries, oldest first (used to warm the in-memory index)."""
+        with self._read_lock:
+            rows = self._read_conn.execute(
+                "SELECT id, site, feeling, description, timestamp FROM feedback ORDER BY id DESC LIMIT ?",
+                (limit,)
+            ).fetchall()
+        return [_row_to_entry(row) for row in reversed(rows)]
+
+    def data_version(self):
+        """Changes whenever another connection (the writer, another API worker) commits; no table is read."""
+        with self._read_lock:
+            return self._read_conn.execute("PRAGMA data_version").fetchone()[0]
+
+    def count(self):
+        with self._read_lock:
+            return self._read_conn.execute("SELECT COUNT(*) FROM feedback").fetchone()[0]
+
+    def close(self):
+        self._read_conn.close()
+
+
+class FeedbackWriter:
+    """
+    Group-commits feedback submissions.
+
+    submit() queues an entry and resolves once it is durably stored, with its
+    new ID. A single writer task takes everything queued so far (up to
+    `max_batch` entries, waiting at most `max_delay` seconds for more) and
+    writes it in one transaction on a dedicated thread. While a commit is in
+    flight new submissions pile up, so batches grow with the load.
+    """
+
+    def __init__(self, db, max_batch=500, max_delay=0.0, latency_samples=1000):
+        self.db = db
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self._queue = None
+        self._task = None
+        self._conn = None
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="feedback-writer")
+        self.batches = 0
+        self.rows = 0
+        self.max_batch_rows = 0
+        self._commit_time = deque(maxlen=latency_samples)
+
+    def _ensure_started(self):
+        if self._task is None or self._task.done():
+            self._queue = asyncio.Queue()
+            self._task = asyncio.ensure_future(self._run())
+
+    async def submit(self, entry):
+        """Stores one feedback dict and returns it with its 'id' set."""
+        self._ensure_started()
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((entry, future))
+        return await future
+
+    async def _next_batch(self):
+        """Returns (batch, stop); a None item in the queue is close()'s stop signal."""
+        item = await self._queue.get()
+        if item is None:
+            return [], True
+        batch = [item]
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.max_delay
+        while len(batch) < self.max_batch:
+            try:
+                item = self._queue.get_nowait()
+            except asyncio.QueueEmpty:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self._queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+            if item is None:
+                return batch, True
+            batch.append(item)
+        return batch, False
+
+    def _commit(self, entries):
+        if self._conn is None:
+            self._conn = self.db.connect()
+        return self.db.insert_many(self._conn, entries)
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        stop = False
+        while not stop:
+            batch, stop = await self._next_batch()
+            if not batch:
+                continue
+            started = time.perf_counter()
+            try:
+                ids = await loop.run_in_executor(self._executor, self._commit, [entry for entry, _ in batch])
+            except Exception as e:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            self._commit_time.append(time.perf_counter() - started)
+            self.batches += 1
+            self.rows += len(batch)
+            self.max_batch_rows = max(self.max_batch_rows, len(batch))
+
+            for (entry, future), new_id in zip(batch, ids):
+                entry['id'] = new_id
+                if not future.done():
+                    future.set_result(entry)
+
+    async def close(self):
+        """Waits for queued submissions to be committed, then stops the writer."""
+        if self._task is not None and not self._task.done():
+            await self._queue.put(None)
+            await self._task
+        self._task = None
+        if self._conn is not None:
+            conn, self._conn = self._conn, None
+            await asyncio.get_running_loop().run_in_executor(self._executor, conn.close)
+
+    def stats(self):
+        commit_ms = np.array(self._commit_time) * 1000
+        return {
+            "batches": self.batches,
+            "rows": self.rows,
+            "mean_batch_rows": self.rows / self.batches if self.batches else None,
+            "max_batch_rows": self.max_batch_rows,
+            "pending": self._queue.qsize() if self._queue is not None else 0,
+            "commit_ms": {
+                "mean": float(commit_ms.mean()) if len(commit_ms) else None,
+                "p95": float(np.percentile(commit_ms, 95)) if len(commit_ms) else None
+            }
+        }
@@ -0,0 +1,155 @@
+## In-memory, time-ordered store for the crowdsourced feedback served by the API.
+
+import threading
+from bisect import bisect_left, bisect_right
+from collections import Counter, deque
+from datetime import datetime, timezone
+from itertools import islice
+
+# Feelings offered by the feedback form; summaries always report these, other values are counted too
+FEELINGS = ("fresh", "smoky", "dusty", "normal")
+
+
+def _order_key(entry):
+    return entry['timestamp'], entry['id']
+
+
+class FeedbackStore:
+    """
+    Feedback entries indexed by time, globally and per site.
+
+    Every entry sits in one global deque and in its site's deque, both ordered
+    by (timestamp, id). Submissions almost always arrive in time order and are
+    appended in O(1); "latest N" reads the tail of a deque, so it never scans or
+    sorts the other entries. Once `max_entries` are stored the oldest ones are
+    evicted.
+    """
+
+    def __init__(self, max_entries=1_000_000):
+        self.max_entries = max_entries
+        self._all = deque()
+        self._by_site = {}
+        self._lock = threading.Lock()
+        self._next_id = 1
+        self.evicted = 0
+
+    def __len__(self):
+        return len(self._all)
+
+    @property
+    def last_id(self):
+        """Highest ID stored so far (0 when empty)."""
+        return self._next_id - 1
+
+    def add(self, entry):
+        """
+        Stores a feedback dict (it needs 'site' and an ISO 'timestamp').
+        An entry without an 'id' gets the next one; entries that already have one keep it.
+        """
+        with self._lock:
+            if entry.get('id') is None:
+                entry['id'] = self._next_id
+            self._next_id = max(self._next_id, entry['id'] + 1)
+            self._insert(self._all, entry)
+            self._insert(self._by_site.setdefault(entry['site'], deque()), entry)
+
+            while len(self._all) > self.max_entries:
+                oldest = self._all.popleft()
+                # Both deques share one ordering, so the global oldest is also its site's oldest
+                site_entries = self._by_site[oldest['site']]
+                site_entries.popleft()
+                if not site_entries:
+                    del self._by_site[oldest['site']]
+                self.evicted += 1
+        return entry
+
+    @staticmethod
+    def _insert(entries, entry):
+        if not entries or _order_key(entries[-1]) <= _order_key(entry):
+            entries.append(entry)
+        else:
+            # Out-of-order timestamp (e.g. a clock step back): rare, so a positional insert is fine
+            entries.insert(bisect_right(entries, _order_key(entry), key=_order_key), entry)
+
+    def latest(self, site=None, limit=50):
+        """Returns up to `limit` entries, newest first, for one site or for all of them."""
+        with self._lock:
+            entries = self._all if site is None else self._by_site.get(site, ())
+            return list(islice(reversed(entries), max(limit, 0)))
+
+    def stats(self):
+        with self._lock:
+            return {
+                "entries": len(self._all),
+                "max_entries": self.max_entries,
+                "evicted": self.evicted,
+                "sites": {site: len(entries) for site, entries in sorted(self._by_site.items())}
+            }
+
+
+def _epoch_seconds(timestamp):
+    """Seconds since the epoch for the API's naive UTC ISO timestamps."""
+    ts = datetime.fromisoformat(timestamp) if isinstance(timestamp, str) else timestamp
+    if ts.tzinfo is None:
+        ts = ts.replace(tzinfo=timezone.utc)
+    return ts.timestamp()
+
+
+class FeedbackCounters:
+    """
+    Rolling per-site, per-feeling counts of feedback in fixed time buckets.
+
+    Each site keeps a deque of [bucket_no, Counter] ordered by bucket; a
+    submission increments one counter and buckets older than `retention_seconds`
+    are dropped. A summary over the last W seconds reads only the buckets inside
+    the window, so its cost does not depend on how much feedback is stored.
+    Windows are rounded out to whole buckets.
+    """
+
+    def __init__(self, bucket_seconds=60, retention_seconds=24 * 3600):
+        self.bucket_seconds = bucket_seconds
+        self.retention_seconds = retention_seconds
+        self._sites = {}
+        self._lock = threading.Lock()
+
+    def _bucket(self, epoch_seconds):
+        return int(epoch_seconds // self.bucket_seconds)
+
+    def _expire(self, buckets, now_bucket):
+        oldest = now_bucket - self.retention_seconds // self.bucket_seconds
+        while buckets and buckets[0][0] < oldest:
+            buckets.popleft()
+
+    def add(self, entry):
+        """Counts one feedback dict ('site', 'feeling' and an ISO 'timestamp')."""
+        bucket = self._bucket(_epoch_seconds(entry['timestamp']))
+        with self._lock:
+            buckets = self._sites.setdefault(entry['site'], deque())
+            if buckets and buckets[-1][0] == bucket:
+                buckets[-1][1][entry['feeling']] += 1
+            elif not buckets or buckets[-1][0] < bucket:
+                buckets.append([bucket, Counter({entry['feeling']: 1})])
+                self._expire(buckets, bucket)
+            elif bucket >= buckets[-1][0] - self.retention_seconds // self.bucket_seconds:
+                # Late arrival for an older bucket
+                pos = bisect_left(buckets, bucket, key=lambda b: b[0])
+                if pos < len(buckets) and buckets[pos][0] == bucket:
+                    buckets[pos][1][entry['feeling']] += 1
+                else:
+                    buckets.insert(pos, [bucket, Counter({entry['feeling']: 1})])
+
+    def summary(self, site=None, window_seconds=3600, now=None):
+        """Returns {site: {feeling: count}} for the last `window_seconds`, for one site or all of them."""
+        now = _epoch_seconds(now or datetime.utcnow())
+        first_bucket = self._bucket(now - window_seconds)
+        with self._lock:
+            sites = [site] if site is not None else sorted(self._sites)
+            result = {}
+            for site_id in sites:
+                counts = Counter()
+                for bucket, bucket_counts in reversed(self._sites.get(site_id, ())):
+                    if bucket < first_bucket:
+                        break
+                    counts.update(bucket_counts)
+                result[site_id] = {**{f: 0 for f in FEELINGS}, **counts}
+            return result
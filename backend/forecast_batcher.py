@@ -0,0 +1,129 @@
+## Coalesces concurrent on-demand forecast requests into one batched predict call per site.
+
+import asyncio
+import time
+from collections import deque
+
+import numpy as np
+import pandas as pd
+
+
+class _Pending:
+    __slots__ = ("features", "future", "enqueued_at")
+
+    def __init__(self, features, future):
+        self.features = features
+        self.future = future
+        self.enqueued_at = time.perf_counter()
+
+
+class ForecastBatcher:
+    """
+    Micro-batches inference requests.
+
+    Requests for the same site that arrive within `window` seconds of the first
+    one are concatenated and sent to `predict_fn(site_id, features_df)` as a single
+    call, which runs in a worker thread so the event loop never blocks on xgboost.
+    A batch is flushed early once it holds `max_batch_rows` rows.
+    `predict_fn` must treat rows independently (see SiteModels.predict), so that
+    batching never changes a request's result.
+    """
+
+    def __init__(self, predict_fn, window=0.005, max_batch_rows=20000, latency_samples=1000):
+        self.predict_fn = predict_fn
+        self.window = window
+        self.max_batch_rows = max_batch_rows
+        self._pending = {}
+        self._pending_rows = {}
+        self._timers = {}
+        self._tasks = set()
+        self.batches = 0
+        self.requests = 0
+        self.rows = 0
+        self.max_batch_requests = 0
+        self._queue_latency = deque(maxlen=latency_samples)
+        self._inference_time = deque(maxlen=latency_samples)
+
+    async def submit(self, site_id, features):
+        """Queues a frame of feature rows and returns {target: predictions} for exactly those rows."""
+        loop = asyncio.get_running_loop()
+        item = _Pending(features, loop.create_future())
+        self._pending.setdefault(site_id, []).append(item)
+        self._pending_rows[site_id] = self._pending_rows.get(site_id, 0) + len(features)
+
+        if self._pending_rows[site_id] >= self.max_batch_rows:
+            self._flush_now(site_id)
+        elif site_id not in self._timers:
+            self._timers[site_id] = loop.call_later(self.window, self._flush_now, site_id)
+        return await item.future
+
+    def _flush_now(self, site_id):
+        timer = self._timers.pop(site_id, None)
+        if timer is not None:
+            timer.cancel()
+        batch = self._pending.pop(site_id, [])
+        self._pending_rows.pop(site_id, None)
+        if batch:
+            task = asyncio.ensure_future(self._run_batch(site_id, batch))
+            # Keep a reference so the task is not garbage-collected mid-flight
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _run_batch(self, site_id, batch):
+        started = time.perf_counter()
+        for item in batch:
+            self._queue_latency.append(started - item.enqueued_at)
+
+        sizes = [len(item.features) for item in batch]
+        self.batches += 1
+        self.requests += len(batch)
+        self.rows += sum(sizes)
+        self.max_batch_requests = max(self.max_batch_requests, len(batch))
+
+        try:
+            combined = batch[0].features if len(batch) == 1 else pd.concat(
+                [item.features for item in batch], ignore_index=True
+            )
+            loop = asyncio.get_running_loop()
+            predictions = await loop.run_in_executor(None, self.predict_fn, site_id, combined)
+        except Exception as e:
+            for item in batch:
+                if not item.future.done():
+                    item.future.set_exception(e)
+            return
+        finally:
+            self._inference_time.append(time.perf_counter() - started)
+
+        # Hand every request back its own slice of the batch
+        offset = 0
+        for item, size in zip(batch, sizes):
+            if not item.future.done():
+                item.future.set_result({
+                    target: values[offset:offset + size] for target, values in predictions.items()
+                })
+            offset += size
+
+    def stats(self):
+        def summarize(samples):
+            if not samples:
+                return {"mean_ms": None, "p50_ms": None, "p95_ms": None, "max_ms": None}
+            values = np.array(samples) * 1000
+            return {
+                "mean_ms": float(values.mean()),
+                "p50_ms": float(np.percentile(values, 50)),
+                "p95_ms": float(np.percentile(values, 95)),
+                "max_ms": float(values.max())
+            }
+
+        return {
+            "window_ms": self.window * 1000,
+            "batches": self.batches,
+            "requests": self.requests,
+            "rows": self.rows,
+            "mean_batch_requests": self.requests / self.batches if self.batches else None,
+            "mean_batch_rows": self.rows / self.batches if self.batches else None,
+            "max_batch_requests": self.max_batch_requests,
+            "pending_requests": sum(len(items) for items in self._pending.values()),
+            "queue_latency": summarize(self._queue_latency),
+            "inference_time": summarize(self._inference_time)
+        }
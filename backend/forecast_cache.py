@@ -0,0 +1,239 @@
+## In-memory cache for the per-site prediction files served by the API.
+
+import os
+import json
+import zlib
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+import prediction_store
+
+# orjson serializes numpy arrays directly and writes NaN as null; the stdlib json module is the fallback
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Column names used in the API payloads
+PREDICTION_RENAMES = {
+    "O3_predicted": "O3_pred",
+    "NO2_predicted": "NO2_pred",
+    "O3_target": "O3_true",
+    "NO2_target": "NO2_true"
+}
+
+POLLUTANTS = ("O3", "NO2")
+TIME_COLUMNS = ['year', 'month', 'day', 'hour', 'timestamp']
+# Payload layouts served by /api/data/site/{id}
+RESPONSE_FORMATS = ("records", "columnar")
+
+
+def file_signature(path):
+    """Returns a (mtime_ns, size) tuple identifying the current version of a file."""
+    st = os.stat(path)
+    return st.st_mtime_ns, st.st_size
+
+
+def frame_to_records(df):
+    """Converts a slice of a prediction frame into the JSON-friendly API records."""
+    df = df.rename(columns=PREDICTION_RENAMES)
+    # Replace NaN with None for JSON compatibility
+    df = df.replace({np.nan: None})
+    df['timestamp'] = df['timestamp'].dt.strftime('%Y-%m-%d %H:%M:%S')
+    return df.to_dict(orient='records')
+
+
+def frame_to_columnar(df):
+    """
+    Converts a slice of a prediction frame into one array per column (renamed like the records),
+    with the timestamps as epoch seconds. Values stay numpy arrays; NaN becomes null when serialized.
+    """
+    timestamps = df['timestamp'].to_numpy().astype('datetime64[s]').astype(np.int64)
+    columns = {
+        PREDICTION_RENAMES.get(col, col): df[col].to_numpy()
+        for col in df.columns if col != 'timestamp'
+    }
+    return {"rows": len(df), "timestamp": timestamps, "columns": columns}
+
+
+def _json_default(obj):
+    if isinstance(obj, np.ndarray):
+        return obj.tolist()
+    if isinstance(obj, np.generic):
+        return obj.item()
+    raise TypeError(f"Type is not JSON serializable: {type(obj).__name__}")
+
+
+def dumps_json(payload):
+    """Serializes a payload that may hold numpy arrays to JSON bytes, writing NaN as null."""
+    if orjson is not None:
+        return orjson.dumps(payload, default=_json_default, option=orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(_replace_nan(payload), default=_json_default, allow_nan=False).encode()
+
+
+def _replace_nan(obj):
+    if isinstance(obj, dict):
+        return {k: _replace_nan(v) for k, v in obj.items()}
+    if isinstance(obj, np.ndarray):
+        if obj.dtype.kind == 'f':
+            return np.where(np.isnan(obj), None, obj).tolist()
+        return obj.tolist()
+    if isinstance(obj, float) and np.isnan(obj):
+        return None
+    return obj
+
+
+def pollutant_columns(df, pollutant):
+    """Keeps the time columns plus the columns that belong to one pollutant (or all of them)."""
+    if pollutant == "all":
+        return df
+    columns = [c for c in df.columns if c in TIME_COLUMNS or c.startswith(f"{pollutant}_")]
+    return df[columns]
+
+
+def iter_csv_chunks(df, chunk_rows=2000, compress=False):
+    """
+    Yields a frame as CSV bytes, `chunk_rows` rows at a time.
+    With compress=True the chunks together form a single gzip stream.
+    """
+    # wbits=31 makes zlib write the gzip header and trailer
+    compressor = zlib.compressobj(wbits=31) if compress else None
+
+    for start in range(0, max(len(df), 1), chunk_rows):
+        chunk = df.iloc[start:start + chunk_rows].to_csv(index=False, header=(start == 0)).encode()
+        if compressor is None:
+            yield chunk
+        else:
+            data = compressor.compress(chunk)
+            if data:
+                yield data
+
+    if compressor is not None:
+        yield compressor.flush()
+
+
+class SiteForecast:
+    """A parsed prediction file plus the payloads already built from it."""
+
+    def __init__(self, site_id, path, source, signature, frame):
+        self.site_id = site_id
+        self.path = path
+        self.source = source
+        self.signature = signature
+        self.frame = frame
+        # Both readers return the frame sorted by timestamp, so ranges are found by binary search
+        self.timestamps = frame['timestamp'].to_numpy()
+        self.payloads = OrderedDict()
+
+    def row_range(self, start=None, end=None):
+        """Row bounds (lo, hi) of the rows with start <= timestamp < end; either bound may be None."""
+        lo, hi = 0, len(self.timestamps)
+        if start is not None:
+            lo = int(np.searchsorted(self.timestamps, np.datetime64(start).astype(self.timestamps.dtype), side='left'))
+        if end is not None:
+            hi = int(np.searchsorted(self.timestamps, np.datetime64(end).astype(self.timestamps.dtype), side='left'))
+        return lo, max(lo, hi)
+
+
+class ForecastCache:
+    """
+    Process-wide cache of the per-site prediction files.
+
+    Each site's predictions (the columnar bundle when present, else the CSV)
+    are loaded once and kept in memory together with the serialized records
+    for recently requested horizons. Every lookup stats the file and reloads
+    it only when its mtime or size has changed.
+    """
+
+    def __init__(self, predictions_dir, max_payloads_per_site=8):
+        self.predictions_dir = predictions_dir
+        self.max_payloads_per_site = max_payloads_per_site
+        self._entries = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.reloads = 0
+
+    def prediction_path(self, site_id):
+        return os.path.join(self.predictions_dir, f"predictions_site_{site_id}.csv")
+
+    def get(self, site_id):
+        """Returns the SiteForecast for a site, raising FileNotFoundError if there is none."""
+        path = self.prediction_path(site_id)
+        source, reader = prediction_store.resolve_source(path)
+        signature = (source,) + file_signature(source)
+
+        with self._lock:
+            entry = self._entries.get(site_id)
+            if entry is not None and entry.signature == signature:
+                self.hits += 1
+                return entry
+            self.misses += 1
+            if entry is not None:
+                self.reloads += 1
+
+        # Load outside the lock so other sites are not blocked
+        entry = SiteForecast(site_id, path, source, signature, reader(path))
+        with self._lock:
+            self._entries[site_id] = entry
+        return entry
+
+    def _payload(self, site_id, key, build):
+        """Returns entry.payloads[key], building it from the site's frame with `build(frame)` on a miss."""
+        entry = self.get(site_id)
+        with self._lock:
+            payload = entry.payloads.get(key)
+            if payload is not None:
+                entry.payloads.move_to_end(key)
+                return payload
+
+        payload = build(entry.frame)
+        with self._lock:
+            entry.payloads[key] = payload
+            while len(entry.payloads) > self.max_payloads_per_site:
+                entry.payloads.popitem(last=False)
+        return payload
+
+    def records(self, site_id, horizon):
+        """Returns the API records for the first `horizon` rows of a site's forecast."""
+        return self.records_slice(site_id, 0, horizon)
+
+    def records_slice(self, site_id, lo, hi):
+        """Returns the API records for rows [lo, hi) of a site's forecast (bounds from SiteForecast.row_range)."""
+        return self._payload(site_id, ("records", lo, hi), lambda frame: frame_to_records(frame.iloc[lo:hi]))
+
+    def columnar_json(self, site_id, horizon):
+        """Returns the serialized columnar payload (see frame_to_columnar) for the first `horizon` rows."""
+        def build(frame):
+            payload = {"site": site_id, "horizon": horizon, "format": "columnar"}
+            payload.update(frame_to_columnar(frame.head(horizon)))
+            return dumps_json(payload)
+        return self._payload(site_id, ("columnar", horizon), build)
+
+    def invalidate(self, site_id=None):
+        """Drops one site (or every site) from the cache."""
+        with self._lock:
+            if site_id is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(site_id, None)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "reloads": self.reloads,
+                "sites": {
+                    site_id: {
+                        "rows": len(entry.frame),
+                        "source": os.path.basename(entry.source),
+                        "mtime_ns": entry.signature[1],
+                        "size": entry.signature[2],
+                        "cached_payloads": list(entry.payloads.keys())
+                    }
+                    for site_id, entry in sorted(self._entries.items())
+                }
+            }
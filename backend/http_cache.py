@@ -0,0 +1,156 @@
+## Conditional GET and pre-compressed bodies for responses built from files main.py writes.
+
+import gzip
+import hashlib
+import threading
+from collections import OrderedDict
+from email.utils import formatdate, parsedate_to_datetime
+
+from fastapi.responses import Response
+
+# Brotli is optional; without it clients that accept gzip get gzip
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Bodies smaller than this are sent uncompressed, the headers would outweigh the savings
+MIN_COMPRESS_BYTES = 512
+
+
+def make_etag(*parts):
+    """A weak ETag for the given key and artifact version (weak: gzip/br variants share it)."""
+    digest = hashlib.sha1(repr(parts).encode()).hexdigest()[:20]
+    return f'W/"{digest}"'
+
+
+def http_date(mtime_ns):
+    return formatdate(mtime_ns / 1e9, usegmt=True)
+
+
+class PreparedBody:
+    """A serialized JSON body plus its gzip/brotli variants, compressed once on first use."""
+
+    def __init__(self, body):
+        self.body = body
+        self._encoded = {}
+        self._lock = threading.Lock()
+
+    def encoded(self, encoding):
+        if encoding == "identity":
+            return self.body
+        with self._lock:
+            data = self._encoded.get(encoding)
+            if data is None:
+                if encoding == "br":
+                    data = brotli.compress(self.body, quality=5)
+                else:
+                    data = gzip.compress(self.body, compresslevel=6, mtime=0)
+                self._encoded[encoding] = data
+            return data
+
+
+class BodyCache:
+    """
+    PreparedBodies keyed by endpoint and parameters, each tagged with the ETag it was built for.
+    A body is rebuilt only when the ETag for its key changes, i.e. when the underlying file does.
+    """
+
+    def __init__(self, max_entries=256):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.builds = 0
+
+    def get(self, key, etag, build):
+        """Returns the PreparedBody for `key` at version `etag`, calling build() -> bytes on a miss."""
+        with self._lock:
+            cached = self._entries.get(key)
+            if cached is not None and cached[0] == etag:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return cached[1]
+
+        prepared = PreparedBody(build())
+        with self._lock:
+            self.builds += 1
+            self._entries[key] = (etag, prepared)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return prepared
+
+    def stats(self):
+        with self._lock:
+            return {"entries": len(self._entries), "hits": self.hits, "builds": self.builds}
+
+
+def _accepted_encodings(header):
+    accepted = set()
+    for part in (header or "").split(","):
+        name, _, params = part.strip().partition(";")
+        q = params.strip()
+        if q.startswith("q="):
+            try:
+                if float(q[2:]) == 0:
+                    continue
+            except ValueError:
+                continue
+        if name:
+            accepted.add(name.strip().lower())
+    return accepted
+
+
+def choose_encoding(accept_encoding):
+    accepted = _accepted_encodings(accept_encoding)
+    if brotli is not None and ("br" in accepted or "*" in accepted):
+        return "br"
+    if "gzip" in accepted or "*" in accepted:
+        return "gzip"
+    return "identity"
+
+
+def _etag_matches(if_none_match, etag):
+    if if_none_match.strip() == "*":
+        return True
+    # Weak comparison: W/"x" and "x" are the same tag
+    wanted = etag.removeprefix("W/")
+    return any(tag.strip().removeprefix("W/") == wanted for tag in if_none_match.split(","))
+
+
+def is_not_modified(request, etag, mtime_ns):
+    """True when the request's validators show the client already has this version."""
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        # If-None-Match takes precedence over If-Modified-Since (RFC 9110)
+        return _etag_matches(if_none_match, etag)
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since and mtime_ns is not None:
+        try:
+            since = parsedate_to_datetime(if_modified_since).timestamp()
+        except (TypeError, ValueError):
+            return False
+        return int(mtime_ns // 1_000_000_000) <= since
+    return False
+
+
+def cached_json_response(request, body_cache, key, etag, mtime_ns, build):
+    """
+    Serves a JSON body that only changes with its artifact version:
+    304 when the client's ETag/Last-Modified still match, otherwise the cached body
+    in the best encoding the client accepts.
+    """
+    headers = {"ETag": etag, "Cache-Control": "no-cache", "Vary": "Accept-Encoding"}
+    if mtime_ns is not None:
+        headers["Last-Modified"] = http_date(mtime_ns)
+    if is_not_modified(request, etag, mtime_ns):
+        return Response(status_code=304, headers=headers)
+
+    prepared = body_cache.get(key, etag, build)
+    encoding = choose_encoding(request.headers.get("accept-encoding"))
+    if len(prepared.body) < MIN_COMPRESS_BYTES:
+        encoding = "identity"
+    if encoding != "identity":
+        headers["Content-Encoding"] = encoding
+    return Response(content=prepared.encoded(encoding), media_type="application/json", headers=headers)
@@ -3,89 +3,286 @@
 # === IMPORTS ===
 import os
 import json
+import time
+import argparse
+import traceback
 import joblib
 import pandas as pd
 import numpy as np
-from datetime import datetime, timedelta
+from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from sklearn.model_selection import train_test_split
 
 # Import your custom modules
 import DataParse
 import data_modeling
+import prediction_store
+import model_registry
+import stage_memory
 
 # --- CONFIGURATION ---
 # Get the absolute path of the directory where this script is located
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 # How many hours into the future do you want to predict?
 FORECAST_HOURS = 48 
+# The forecast will begin on October 12, 2025, as requested.
+FORECAST_START = datetime(2025, 10, 12, 0)
+# Longest horizon generate_future_features supports (one leap year of hours)
+MAX_FORECAST_HOURS = 366 * 24
+# Input features that get a small random variation in synthesized future rows
+VARIED_FEATURES = ['O3_forecast', 'NO2_forecast', 'T_forecast', 'q_forecast',
+                   'u_forecast', 'v_forecast', 'w_forecast', 'NO2_satellite',
+                   'HCHO_satellite', 'ratio_satellite']
+# Incremental updates: extra boosting rounds on new rows, and the RMSE ratio that forces a full retrain
+INCREMENTAL_ROUNDS = 200
+DRIFT_THRESHOLD = 1.5
+# Monitoring sites processed by a full pipeline run
+SITE_IDS = list(range(1, 8))
 
 # --- HELPER FUNCTION TO CREATE FUTURE DATA ---
-def generate_future_features(historical_df, hours_to_forecast):
+def generate_future_features(historical_df, hours_to_forecast, start=None, seed=None):
     """
     Generates a DataFrame with plausible input features for future timestamps.
-    It uses the last known data point as a template and starts from a defined future date.
+    It uses the last known data point as a template and starts from a defined future date
+    (FORECAST_START unless `start` is given). The whole horizon is built in one go:
+    timestamps come from pd.date_range and the +/- 2% hourly variation from one seeded random matrix.
     """
+    if not 0 < hours_to_forecast <= MAX_FORECAST_HOURS:
+        raise ValueError(f"hours_to_forecast must be between 1 and {MAX_FORECAST_HOURS}")
     print(f"🔩 Synthesizing input features for the next {hours_to_forecast} hours...")
     
-    # Ensure the historical_df is sorted by time to get the actual last known row
-    historical_df = historical_df.sort_index()
-    last_known_row = historical_df.iloc[-1:].copy()
+    # Use the actual last known row in time
+    if not historical_df.index.is_monotonic_increasing:
+        historical_df = historical_df.sort_index()
+    last_known_row = historical_df.iloc[-1:]
+
+    # Repeat the template row once per forecast hour
+    future_df = last_known_row.iloc[np.zeros(hours_to_forecast, dtype=np.intp)].reset_index(drop=True)
+
+    # Update the time features IN THE COLUMNS
+    timestamps = pd.date_range(start or FORECAST_START, periods=hours_to_forecast, freq='h')
+    future_df['year'] = timestamps.year.astype(np.int64)
+    future_df['month'] = timestamps.month.astype(np.int64)
+    future_df['day'] = timestamps.day.astype(np.int64)
+    future_df['hour'] = timestamps.hour.astype(np.int64)
+
+    # Add slight random variation to make the forecast look more realistic
+    varied_cols = [col for col in VARIED_FEATURES
+                   if col in future_df and pd.api.types.is_numeric_dtype(future_df[col])]
+    rng = np.random.default_rng(seed)
+    variation = rng.uniform(0.98, 1.02, size=(hours_to_forecast, len(varied_cols))) # +/- 2% change per hour
+    future_df[varied_cols] = future_df[varied_cols].to_numpy(dtype=np.float64) * variation
+
+    return future_df
+
+
+def load_historical_data(site_no, fast_ingest=False):
+    """
+    Loads a site's train and unseen files and combines them into one timestamp-indexed frame.
+    fast_ingest=True uses DataParse's typed, cached CSV reader.
+    """
+    train_df_from_file, unseen_df_from_file = DataParse.load_site_data(site_no, fast=fast_ingest)
+    
+    # Combine all available data for training
+    historical_df = pd.concat([train_df_from_file, unseen_df_from_file.drop(columns=['O3_target', 'NO2_target'], errors='ignore')], ignore_index=True)
+    historical_df = DataParse.create_timestamp_index(historical_df)
+    print(f"✅ Loaded and combined historical data for Site {site_no} — Total shape: {historical_df.shape}")
+    return historical_df
+
+
+def load_historical_parts(site_no):
+    """
+    Low-memory counterpart of load_historical_data: the site's train and unseen frames, each
+    timestamp-indexed, without concatenating them (DataParse.preprocess_compact takes the list).
+    """
+    train_df, unseen_df = DataParse.load_site_data(site_no, fast=True)
+    parts = [DataParse.create_timestamp_index(train_df),
+             DataParse.create_timestamp_index(unseen_df.drop(columns=DataParse.TARGETS, errors='ignore'))]
+    print(f"✅ Loaded historical data for Site {site_no} — Total rows: {sum(len(part) for part in parts)}")
+    return parts
+
+
+def history_summary(parts):
+    """
+    The few rows of the historical frames that the forecast and the model registry read:
+    each frame's latest row and latest labelled row, as one timestamp-sorted frame.
+    """
+    rows = []
+    for part in parts:
+        if not len(part):
+            continue
+        rows.append(part.iloc[[part.index.argmax()]])
+        if all(t in part.columns for t in DataParse.TARGETS):
+            labelled = part[part[DataParse.TARGETS].notna().all(axis=1)]
+            if len(labelled):
+                rows.append(labelled.iloc[[labelled.index.argmax()]])
+    return pd.concat(rows).sort_index(kind='stable')
+
+
+def write_forecast(site_no, historical_df, models, scaler, forecast_hours=FORECAST_HOURS, forecast_start=None,
+                   compact=False):
+    """
+    Predicts the synthesized forecast window and saves it (CSV + columnar bundle). Returns the CSV path.
+    compact=True scales the future features with DataParse's float32 path.
+    """
+    future_features_df = generate_future_features(historical_df, hours_to_forecast=forecast_hours, start=forecast_start)
     
-    # --- MODIFIED: Start forecast from the requested date ---
-    # The forecast will begin on October 12, 2025, as requested.
-    forecast_start_date = datetime(2025, 10, 12, 0)
+    # Preprocess these future features using the *same scaler*
+    # This call only returns two values because the future DF has no target columns
+    X_future_scaled, scaler = DataParse.preprocess_data(future_features_df, scaler=scaler, compact=compact)
+    print("✅ Future features preprocessed for prediction.")
+
+    # Make the predictions
+    future_predictions = data_modeling.predict(models, X_future_scaled)
     
-    future_rows = []
-    for i in range(hours_to_forecast): # Loop for 48 hours starting from hour 0
-        future_timestamp = forecast_start_date + timedelta(hours=i)
-        new_row = last_known_row.copy()
-        
-        # Update the time features IN THE COLUMNS
-        new_row['year'] = future_timestamp.year
-        new_row['month'] = future_timestamp.month
-        new_row['day'] = future_timestamp.day
-        new_row['hour'] = future_timestamp.hour
-        
-        # Add slight random variation to make the forecast look more realistic
-        for col in ['O3_forecast', 'NO2_forecast', 'T_forecast', 'q_forecast', 
-                    'u_forecast', 'v_forecast', 'w_forecast', 'NO2_satellite', 
-                    'HCHO_satellite', 'ratio_satellite']:
-            if col in new_row and pd.api.types.is_numeric_dtype(new_row[col]):
-                variation = 1 + np.random.uniform(-0.02, 0.02) # +/- 2% change per hour
-                new_row[col] *= variation
-        
-        future_rows.append(new_row)
-        
-    # Concatenate and reset the index to make it a clean DataFrame
-    future_df = pd.concat(future_rows)
-    return future_df.reset_index(drop=True)
+    # Combine predictions with the future features DataFrame
+    future_features_df['O3_predicted'] = future_predictions['O3_target']
+    future_features_df['NO2_predicted'] = future_predictions['NO2_target']
+
+    # Save the forecast to a CSV file inside the backend directory
+    predictions_dir = os.path.join(BASE_DIR, "predictions")
+    os.makedirs(predictions_dir, exist_ok=True)
+    forecast_file = os.path.join(predictions_dir, f"predictions_site_{site_no}.csv")
+    future_features_df.to_csv(forecast_file, index=False)
+    # Columnar copy that the API memory-maps instead of parsing the CSV
+    prediction_store.write_prediction_bundle(future_features_df, forecast_file)
+    print(f"✅ Future forecast saved to {forecast_file}")
+    
+    print("\n=== Sample of Final Forecast ===")
+    print(future_features_df[['year', 'month', 'day', 'hour', 'O3_predicted', 'NO2_predicted']].head())
+    return forecast_file
+
+
+def run_incremental_update_for_site(site_no, n_jobs=-1, extra_rounds=INCREMENTAL_ROUNDS,
+                                    drift_threshold=DRIFT_THRESHOLD, fast_ingest=False, **pipeline_options):
+    """
+    Updates a site's saved models with only the rows that arrived since they were trained.
+    Boosting continues from the registry's live models for `extra_rounds` more rounds, reusing
+    the saved scaler. Falls back to a full retrain when the site has no saved models or when the
+    new rows show drift (see data_modeling.detect_drift). Returns (forecast_file, metrics_file).
+    """
+    try:
+        site_models = model_registry.load_site_models(site_no)
+    except FileNotFoundError:
+        print(f"ℹ️  No saved models for Site {site_no} — running a full retrain.")
+        return run_pipeline_for_site(site_no, n_jobs=n_jobs, raise_errors=True, fast_ingest=fast_ingest, **pipeline_options)
 
+    print(f"\n--- Incremental update for Site {site_no} (model version {site_models.version}) ---")
+    historical_df = load_historical_data(site_no, fast_ingest=fast_ingest)
+    metrics_file = os.path.join(BASE_DIR, "metrics", f"metrics_site_{site_no}.json")
 
-def run_pipeline_for_site(site_no):
+    # Only labelled rows newer than what the live models were trained on
+    trained_until = site_models.last_labelled_timestamp
+    new_df = historical_df.dropna(subset=site_models.targets)
+    if trained_until is not None:
+        new_df = new_df[new_df.index > trained_until]
+    new_df = new_df.reset_index()
+    if new_df.empty:
+        print(f"✅ Site {site_no} is up to date — no new labelled rows since {trained_until}.")
+        forecast_file = write_forecast(site_no, historical_df, site_models.models, site_models.scaler,
+                                       pipeline_options.get("forecast_hours", FORECAST_HOURS),
+                                       pipeline_options.get("forecast_start"))
+        return forecast_file, metrics_file
+
+    # Fill satellite gaps with the training-time values, as SiteModels.predict does: the batch's own
+    # mean differs (and is NaN when the new rows have no satellite data at all)
+    new_df = new_df.fillna(site_models.fill_values)
+    # preprocess_data works in place, so new_df keeps exactly the rows that end up in X_new
+    X_new, _ = DataParse.preprocess_data(new_df, scaler=site_models.scaler)
+    y_new = new_df[site_models.targets]
+    print(f"🧮 {len(y_new)} new rows since {trained_until}.")
+
+    drifted, new_rows_metrics = data_modeling.detect_drift(
+        site_models.models, X_new, y_new, site_models.manifest.get("metrics"), threshold=drift_threshold
+    )
+    if drifted:
+        print(f"🔁 Falling back to a full retrain for Site {site_no}.")
+        return run_pipeline_for_site(site_no, n_jobs=n_jobs, raise_errors=True, fast_ingest=fast_ingest, **pipeline_options)
+
+    models = data_modeling.continue_xgboost_models(site_models.models, X_new, y_new,
+                                                   extra_rounds=extra_rounds, n_jobs=n_jobs)
+    version = model_registry.save_site_models(
+        site_no, models, site_models.scaler, site_models.features,
+        metrics=site_models.manifest.get("metrics"), historical_df=historical_df,
+        extra={"fill_values": site_models.fill_values, "incremental": {
+            "base_version": site_models.version,
+            "new_rows": int(len(y_new)),
+            "extra_rounds": extra_rounds,
+            "new_rows_metrics_before_update": new_rows_metrics
+        }}
+    )
+    print(f"✅ Updated models saved to the registry as version {version}")
+
+    forecast_file = write_forecast(site_no, historical_df, models, site_models.scaler,
+                                   pipeline_options.get("forecast_hours", FORECAST_HOURS),
+                                   pipeline_options.get("forecast_start"))
+    print(f"--- Site {site_no} Updated Successfully ---")
+    return forecast_file, metrics_file
+
+
+def run_pipeline_for_site(site_no, n_jobs=-1, raise_errors=False, multi_output=False,
+                          forecast_hours=FORECAST_HOURS, forecast_start=None,
+                          incremental=False, extra_rounds=INCREMENTAL_ROUNDS, drift_threshold=DRIFT_THRESHOLD,
+                          fast_ingest=False, low_memory=False, memory_report=False):
     """
     Runs the complete data loading, preprocessing, training, and prediction pipeline for a single site.
     Saves both predictions and performance metrics to separate files.
+    n_jobs is the xgboost thread count; with raise_errors=True failures propagate instead of returning (None, None).
+    multi_output=True trains one model for both targets instead of one per target.
+    forecast_hours/forecast_start control the synthesized forecast window.
+    incremental=True updates the saved models instead (see run_incremental_update_for_site).
+    fast_ingest=True reads the site CSVs with the typed, cached loader.
+    low_memory=True keeps the features as one float32 matrix end to end: typed loading, in-place
+    scaling (DataParse.preprocess_compact) and a train/test split made of views.
+    memory_report=True prints the peak memory of each stage (see stage_memory.StageMemoryReport).
     """
-    print(f"\n--- Processing Site {site_no} ---")
+    report = stage_memory.StageMemoryReport(enabled=memory_report)
     try:
+        if incremental:
+            return run_incremental_update_for_site(
+                site_no, n_jobs=n_jobs, extra_rounds=extra_rounds, drift_threshold=drift_threshold,
+                multi_output=multi_output, forecast_hours=forecast_hours, forecast_start=forecast_start,
+                fast_ingest=fast_ingest, low_memory=low_memory, memory_report=memory_report
+            )
+
+        print(f"\n--- Processing Site {site_no} ---")
         # 1. Load and Combine All Historical Data
-        train_df_from_file, unseen_df_from_file = DataParse.load_site_data(site_no)
-        
-        # Combine all available data for training
-        historical_df = pd.concat([train_df_from_file, unseen_df_from_file.drop(columns=['O3_target', 'NO2_target'], errors='ignore')], ignore_index=True)
-        historical_df = DataParse.create_timestamp_index(historical_df)
-        print(f"✅ Loaded and combined historical data for Site {site_no} — Total shape: {historical_df.shape}")
+        report.start()
+        if low_memory:
+            # Train and unseen stay separate: no concatenated copy of the history is built
+            historical_parts = load_historical_parts(site_no)
+            historical_df = history_summary(historical_parts)
+        else:
+            historical_df = load_historical_data(site_no, fast_ingest=fast_ingest)
+        report.mark("load")
 
         # 2. Preprocess Historical Data for Training and Evaluation
         # The preprocessor will handle separating X and y
-        X_historical, y_historical, scaler = DataParse.preprocess_data(historical_df.reset_index())
+        if low_memory:
+            # Filled straight from the typed frames, which are released once X is built
+            X_historical, y_historical, scaler = DataParse.preprocess_compact(historical_parts)
+            del historical_parts
+        else:
+            X_historical, y_historical, scaler = DataParse.preprocess_data(historical_df.reset_index())
         print("✅ Historical data preprocessed.")
+        report.mark("preprocess")
         
         # 3. (Goal 2) Train Model and Evaluate Performance on a held-out test set
-        X_train, X_test, y_train, y_test = train_test_split(X_historical, y_historical, test_size=0.2, random_state=42, shuffle=False) # shuffle=False for time series
+        if low_memory:
+            # Same rows as train_test_split(shuffle=False), as views instead of copies
+            n_test = int(np.ceil(0.2 * len(X_historical)))
+            n_train = len(X_historical) - n_test
+            X_train, X_test = X_historical[:n_train], X_historical[n_train:]
+            y_train, y_test = y_historical.iloc[:n_train], y_historical.iloc[n_train:]
+        else:
+            X_train, X_test, y_train, y_test = train_test_split(X_historical, y_historical, test_size=0.2, random_state=42, shuffle=False) # shuffle=False for time series
         print(f"🧠 Training model on {X_train.shape[0]} samples, testing on {X_test.shape[0]} samples.")
+        report.mark("split")
         
-        models, metrics = data_modeling.train_xgboost_models(X_train, y_train, X_test, y_test)
+        models, metrics = data_modeling.train_xgboost_models(
+            X_train, y_train, X_test, y_test, n_jobs=n_jobs, multi_output=multi_output
+        )
+        report.mark("train")
         
         # Save the metrics to a JSON file inside the backend directory
         metrics_dir = os.path.join(BASE_DIR, "metrics")
@@ -95,57 +292,136 @@ def run_pipeline_for_site(site_no):
             json.dump(metrics, f, indent=4)
         print(f"✅ Accuracy metrics saved to {metrics_file}")
 
-        # 4. (Goal 1) Generate the Forecast for the next 48 hours
-        future_features_df = generate_future_features(historical_df, hours_to_forecast=FORECAST_HOURS)
-        
-        # Preprocess these future features using the *same scaler*
-        # This call only returns two values because the future DF has no target columns
-        X_future_scaled, scaler = DataParse.preprocess_data(future_features_df, scaler=scaler)
-        print("✅ Future features preprocessed for prediction.")
+        # Keep the boosters, scaler and feature list so the API can forecast on demand
+        version = model_registry.save_site_models(
+            site_no, models, scaler, DataParse.available_features(historical_df),
+            metrics=metrics, historical_df=historical_df
+        )
+        print(f"✅ Models saved to the registry as version {version}")
+        report.mark("save")
 
-        # Make the predictions
-        future_predictions = data_modeling.predict(models, X_future_scaled)
-        
-        # Combine predictions with the future features DataFrame
-        future_features_df['O3_predicted'] = future_predictions['O3_target']
-        future_features_df['NO2_predicted'] = future_predictions['NO2_target']
-
-        # Save the forecast to a CSV file inside the backend directory
-        predictions_dir = os.path.join(BASE_DIR, "predictions")
-        os.makedirs(predictions_dir, exist_ok=True)
-        forecast_file = os.path.join(predictions_dir, f"predictions_site_{site_no}.csv")
-        future_features_df.to_csv(forecast_file, index=False)
-        print(f"✅ Future forecast saved to {forecast_file}")
-        
-        print("\n=== Sample of Final Forecast ===")
-        print(future_features_df[['year', 'month', 'day', 'hour', 'O3_predicted', 'NO2_predicted']].head())
+        # 4. (Goal 1) Generate the Forecast for the next `forecast_hours` hours
+        forecast_file = write_forecast(site_no, historical_df, models, scaler, forecast_hours, forecast_start,
+                                       compact=low_memory)
+        report.mark("forecast")
+        report.print_report(f"Site {site_no} memory by stage")
         print(f"--- Site {site_no} Finished Successfully ---")
         
         return forecast_file, metrics_file
 
     except FileNotFoundError:
+        if raise_errors:
+            raise
         print(f"⚠️  Site {site_no} SKIPPED — A data file was not found.")
         return None, None
     except Exception as e:
+        if raise_errors:
+            raise
         print(f"❌ ERROR processing site {site_no}: {e}")
-        import traceback
         traceback.print_exc()
         return None, None
+    finally:
+        report.stop()
+
+
+# --- PARALLEL MULTI-SITE PIPELINE ---
+def plan_cpu_budget(n_sites, workers=None, cores=None):
+    """
+    Splits the available cores between pipeline workers and xgboost threads
+    so that workers x threads_per_worker never exceeds the core count.
+    Returns (workers, threads_per_worker).
+    """
+    cores = cores or os.cpu_count() or 1
+    workers = max(1, min(workers or cores, n_sites, cores))
+    return workers, max(1, cores // workers)
+
+
+def _site_worker(site_no, n_jobs, pipeline_options):
+    """Process-pool entry point: runs one site and reports the outcome instead of raising."""
+    start = time.perf_counter()
+    result = {"site": site_no, "pred_file": None, "metrics_file": None, "error": None}
+    try:
+        result["pred_file"], result["metrics_file"] = run_pipeline_for_site(
+            site_no, n_jobs=n_jobs, raise_errors=True, **pipeline_options
+        )
+    except FileNotFoundError as e:
+        result["error"] = f"data file not found: {e}"
+    except Exception as e:
+        result["error"] = f"{type(e).__name__}: {e}"
+        traceback.print_exc()
+    result["seconds"] = time.perf_counter() - start
+    return result
+
+
+def run_pipeline_parallel(site_ids=SITE_IDS, workers=None, **pipeline_options):
+    """
+    Runs the pipeline for several sites over a process pool.
+    Extra keyword arguments are passed on to run_pipeline_for_site.
+    A failing site (or crashed worker) is recorded in its result and does not stop the others.
+    Returns (results, wall_clock_seconds) with results sorted by site.
+    """
+    workers, threads = plan_cpu_budget(len(site_ids), workers)
+    print(f"🚀 Running {len(site_ids)} sites on {workers} worker(s) x {threads} xgboost thread(s)")
+
+    start = time.perf_counter()
+    results = []
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(_site_worker, site_no, threads, pipeline_options): site_no for site_no in site_ids}
+        for future in as_completed(futures):
+            site_no = futures[future]
+            try:
+                results.append(future.result())
+            except Exception as e:
+                # The worker process itself died (e.g. killed for running out of memory)
+                results.append({"site": site_no, "pred_file": None, "metrics_file": None,
+                                "error": f"worker failed: {type(e).__name__}: {e}", "seconds": None})
+    return sorted(results, key=lambda r: r["site"]), time.perf_counter() - start
+
+
+def run_pipeline_serial(site_ids=SITE_IDS, **pipeline_options):
+    """Runs the pipeline one site after another. Returns (results, wall_clock_seconds)."""
+    start = time.perf_counter()
+    results = []
+    for site_no in site_ids:
+        site_start = time.perf_counter()
+        pred_file, metrics_file = run_pipeline_for_site(site_no, **pipeline_options)
+        results.append({"site": site_no, "pred_file": pred_file, "metrics_file": metrics_file,
+                        "error": None if pred_file else "failed (see log above)",
+                        "seconds": time.perf_counter() - site_start})
+    return results, time.perf_counter() - start
 
 # This block is the main entry point when you run "python main.py"
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Air quality prediction pipeline")
+    parser.add_argument("--sites", type=int, nargs="+", default=SITE_IDS, help="Site numbers to process")
+    parser.add_argument("--parallel", action="store_true", help="Process sites over a process pool")
+    parser.add_argument("--workers", type=int, default=None, help="Number of worker processes (default: one per core, up to the number of sites)")
+    parser.add_argument("--compare-serial", action="store_true", help="With --parallel, run the same sites again serially and report the speedup")
+    parser.add_argument("--multi-output", action="store_true", help="Train one multi-output model for O3 and NO2")
+    parser.add_argument("--forecast-hours", type=int, default=FORECAST_HOURS, help=f"Forecast horizon in hours (up to {MAX_FORECAST_HOURS})")
+    parser.add_argument("--forecast-start", type=datetime.fromisoformat, default=None, help="Forecast start time, e.g. 2025-10-12T00:00")
+    parser.add_argument("--incremental", action="store_true", help="Continue training the saved models on new rows only")
+    parser.add_argument("--extra-rounds", type=int, default=INCREMENTAL_ROUNDS, help="Boosting rounds added by an incremental update")
+    parser.add_argument("--drift-threshold", type=float, default=DRIFT_THRESHOLD, help="New-row RMSE / training RMSE ratio that triggers a full retrain")
+    parser.add_argument("--fast-ingest", action="store_true", help="Read site CSVs with the typed float32 loader and parsed-file cache")
+    parser.add_argument("--low-memory", action="store_true", help="Keep features as one float32 matrix, scaled in place (implies --fast-ingest)")
+    parser.add_argument("--memory-report", action="store_true", help="Print the peak memory of each pipeline stage per site")
+    args = parser.parse_args()
+    pipeline_options = dict(multi_output=args.multi_output, forecast_hours=args.forecast_hours,
+                            forecast_start=args.forecast_start, incremental=args.incremental,
+                            extra_rounds=args.extra_rounds, drift_threshold=args.drift_threshold,
+                            fast_ingest=args.fast_ingest, low_memory=args.low_memory,
+                            memory_report=args.memory_report)
+
     print("--- Starting Air Quality Prediction Pipeline for All Sites ---")
     
-    created_pred_files = []
-    created_metrics_files = []
-    
-    # Loop through all 7 sites
-    for site_id in range(1, 8):
-        pred_file, metrics_file = run_pipeline_for_site(site_id)
-        if pred_file:
-            created_pred_files.append(pred_file)
-        if metrics_file:
-            created_metrics_files.append(metrics_file)
+    if args.parallel:
+        results, wall_clock = run_pipeline_parallel(args.sites, workers=args.workers, **pipeline_options)
+    else:
+        results, wall_clock = run_pipeline_serial(args.sites, **pipeline_options)
+
+    created_pred_files = [r["pred_file"] for r in results if r["pred_file"]]
+    created_metrics_files = [r["metrics_file"] for r in results if r["metrics_file"]]
             
     print("\n--- ✅ PIPELINE FINISHED ---")
     if created_pred_files:
@@ -160,4 +436,21 @@ if __name__ == "__main__":
         for f in created_metrics_files:
             print(f"  - {f}")
     else:
-        print("No metrics files were created.")
\ No newline at end of file
+        print("No metrics files were created.")
+
+    failed = [r for r in results if r["error"]]
+    if failed:
+        print("\nFailed sites:")
+        for r in failed:
+            print(f"  - Site {r['site']}: {r['error']}")
+
+    print(f"\n⏱️  Total wall-clock: {wall_clock:.1f}s")
+    if args.parallel:
+        # Measured inside the pool, so contended workers make this larger than a real serial run
+        worker_time = sum(r["seconds"] or 0.0 for r in results)
+        print(f"   Sum of worker times: {worker_time:.1f}s")
+        if args.compare_serial:
+            print("\n--- Re-running the same sites serially for comparison ---")
+            _, serial_wall_clock = run_pipeline_serial(args.sites, **pipeline_options)
+            speedup = serial_wall_clock / wall_clock if wall_clock else float("nan")
+            print(f"\n⏱️  Serial wall-clock: {serial_wall_clock:.1f}s — parallel speedup {speedup:.2f}x")
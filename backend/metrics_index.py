@@ -0,0 +1,143 @@
+## In-memory index of the per-site model metrics served by the API.
+
+import os
+import json
+import threading
+
+import numpy as np
+
+# Thresholds used to turn each metric into a 0.0 - 1.0 score
+RUBRIC = {
+    "RMSE": {"good": 12, "bad": 20, "higher_is_better": False},
+    "MAE":  {"good": 9,  "bad": 16, "higher_is_better": False},
+    "Bias": {"good": 1,  "bad": 5,  "higher_is_better": False},
+    "R2":   {"good": 0.8,"bad": 0.5,"higher_is_better": True},
+    "RIA":  {"good": 0.8,"bad": 0.5,"higher_is_better": True},
+}
+RUBRIC_METRICS = list(RUBRIC)
+_GOOD = np.array([RUBRIC[m]["good"] for m in RUBRIC_METRICS], dtype=float)
+_BAD = np.array([RUBRIC[m]["bad"] for m in RUBRIC_METRICS], dtype=float)
+
+# Columns of the /api/metrics/all records, in order
+REPORTED_METRICS = ["RMSE", "R2", "RIA", "MAE", "Bias"]
+
+
+def score_metrics(values):
+    """
+    Scores many metric rows at once.
+    `values` is an (n, len(RUBRIC_METRICS)) array with NaN for missing metrics.
+    Returns (combined_scores, normalized_scores, available_mask).
+    """
+    values = np.array(values, dtype=float).reshape(-1, len(RUBRIC_METRICS))
+    values[:, RUBRIC_METRICS.index("Bias")] = np.abs(values[:, RUBRIC_METRICS.index("Bias")])
+
+    # (value - bad) / (good - bad) covers both directions: the denominator's sign flips with the rubric
+    normalized = np.clip((values - _BAD) / (_GOOD - _BAD), 0.0, 1.0)
+    available = ~np.isnan(values)
+
+    counts = available.sum(axis=1)
+    totals = np.where(available, normalized, 0.0).sum(axis=1)
+    combined = np.divide(totals, counts, out=np.zeros(len(values)), where=counts > 0)
+    return combined, normalized, available
+
+
+def _metric_row(metrics_dict):
+    return [
+        np.nan if metrics_dict.get(m) is None else metrics_dict[m]
+        for m in RUBRIC_METRICS
+    ]
+
+
+class MetricsIndex:
+    """
+    Raw metrics, normalized scores and combined scores for every site/pollutant.
+
+    The index is rebuilt from the metrics_site_N.json files whenever one of
+    them is added, removed or rewritten; otherwise lookups are plain dict reads.
+    """
+
+    def __init__(self, metrics_dir, site_ids=range(1, 8)):
+        self.metrics_dir = metrics_dir
+        self.site_ids = list(site_ids)
+        self._lock = threading.Lock()
+        self._signature = None
+        self.sites = {}
+        self.all_records = []
+        self.builds = 0
+
+    def metrics_path(self, site_id):
+        return os.path.join(self.metrics_dir, f"metrics_site_{site_id}.json")
+
+    def _current_signature(self):
+        signature = []
+        for site_id in self.site_ids:
+            try:
+                st = os.stat(self.metrics_path(site_id))
+                signature.append((st.st_mtime_ns, st.st_size))
+            except FileNotFoundError:
+                signature.append(None)
+        return tuple(signature)
+
+    def refresh(self):
+        """Rebuilds the index if any metrics file changed since the last build."""
+        signature = self._current_signature()
+        if signature != self._signature:
+            with self._lock:
+                if signature != self._signature:
+                    self._build(signature)
+        return self
+
+    def _build(self, signature):
+        rows = []
+        sites = {}
+        for site_id in self.site_ids:
+            try:
+                with open(self.metrics_path(site_id), 'r') as f:
+                    data = json.load(f)
+            except FileNotFoundError:
+                continue
+            sites[site_id] = {}
+            for pollutant, metrics in data.items():
+                rows.append((site_id, pollutant, metrics or {}))
+
+        # Score every site/pollutant in one pass
+        combined, normalized, available = score_metrics([_metric_row(m) for _, _, m in rows])
+
+        all_records = []
+        for i, (site_id, pollutant, metrics) in enumerate(rows):
+            scores = {m: float(normalized[i, j]) for j, m in enumerate(RUBRIC_METRICS) if available[i, j]}
+            entry = {
+                "metrics": metrics,
+                "combined_score": float(combined[i]),
+                "normalized_scores": scores
+            }
+            sites[site_id][pollutant] = entry
+
+            record = {'site': site_id, 'pollutant': pollutant}
+            record.update({m: metrics.get(m) for m in REPORTED_METRICS})
+            record['combined_score'] = entry["combined_score"]
+            record['normalized_scores'] = scores
+            all_records.append(record)
+
+        self.sites = sites
+        self.all_records = all_records
+        self._signature = signature
+        self.builds += 1
+
+    @property
+    def version(self):
+        """Signature of the metrics files the index was last built from; changes whenever one of them does."""
+        return self._signature
+
+    @property
+    def last_modified_ns(self):
+        """Newest mtime among the indexed metrics files, or None if there are none."""
+        mtimes = [sig[0] for sig in self._signature or () if sig is not None]
+        return max(mtimes) if mtimes else None
+
+    def site(self, site_id):
+        """Returns {pollutant_key: entry} for a site, or None if it has no metrics file."""
+        return self.refresh().sites.get(site_id)
+
+    def all(self):
+        return self.refresh().all_records
@@ -0,0 +1,242 @@
+## Saves and loads the trained per-site models so the API can run inference.
+
+## Layout (one versioned directory per training run, CURRENT points at the live one):
+##   models/site_N/CURRENT
+##   models/site_N/<version>/manifest.json   features, targets, metrics, template row, ...
+##   models/site_N/<version>/<target>.ubj    native XGBoost boosters
+##   models/site_N/<version>/scaler.joblib   fitted StandardScaler
+
+import os
+import json
+import shutil
+from datetime import datetime
+
+import joblib
+import numpy as np
+import pandas as pd
+import xgboost
+from xgboost import XGBRegressor
+
+import DataParse
+import data_modeling
+
+_CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
+MODELS_DIR = os.path.join(_CURRENT_DIR, "models")
+REGISTRY_FORMAT_VERSION = 1
+# How many older versions to keep next to the live one
+KEEP_VERSIONS = 3
+
+
+def site_dir(site_no, models_dir=MODELS_DIR):
+    return os.path.join(models_dir, f"site_{site_no}")
+
+
+def current_version(site_no, models_dir=MODELS_DIR):
+    """Returns the live model version for a site, or None if nothing was saved yet."""
+    try:
+        with open(os.path.join(site_dir(site_no, models_dir), "CURRENT"), 'r') as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def _model_filename(key):
+    return ("+".join(key) if isinstance(key, tuple) else key) + ".ubj"
+
+
+def training_fill_values(scaler, features):
+    """
+    Values that filled the satellite feature gaps at training time, used to fill them at inference.
+    DataParse records them on the fitted scaler. Scalers fitted before that only have their means,
+    which are taken over the labelled rows after filling and so only approximate the fill values.
+    """
+    values = getattr(scaler, "fill_values_", None)
+    if values is not None:
+        return dict(values)
+    return {col: float(scaler.mean_[i]) for i, col in enumerate(features) if col in DataParse.SATELLITE_COLS}
+
+
+def _json_safe(value):
+    if isinstance(value, (np.floating, float)):
+        return None if np.isnan(value) else float(value)
+    if isinstance(value, np.integer):
+        return int(value)
+    if isinstance(value, pd.Timestamp):
+        return value.isoformat()
+    return value
+
+
+class SiteModels:
+    """The live models, scaler and metadata of one site, ready for inference."""
+
+    def __init__(self, site_no, version, manifest, models, scaler):
+        self.site_no = site_no
+        self.version = version
+        self.manifest = manifest
+        self.models = models
+        self.scaler = scaler
+
+    @property
+    def features(self):
+        return self.manifest["features"]
+
+    @property
+    def targets(self):
+        return self.manifest["targets"]
+
+    @property
+    def last_timestamp(self):
+        ts = self.manifest.get("last_timestamp")
+        return pd.Timestamp(ts) if ts else None
+
+    @property
+    def last_labelled_timestamp(self):
+        """Newest row with target values the models were trained on."""
+        ts = self.manifest.get("last_labelled_timestamp")
+        return pd.Timestamp(ts) if ts else None
+
+    @property
+    def fill_values(self):
+        """Values for missing satellite features (older manifests: see training_fill_values)."""
+        values = self.manifest.get("fill_values")
+        return values if values is not None else training_fill_values(self.scaler, self.features)
+
+    def template_frame(self):
+        """The last known historical row, as a one-row frame for generate_future_features."""
+        row = self.manifest.get("template_row") or {}
+        df = pd.DataFrame([{k: (np.nan if v is None else v) for k, v in row.items()}])
+        if self.last_timestamp is not None:
+            df.index = pd.DatetimeIndex([self.last_timestamp], name='timestamp')
+        return df
+
+    def predict(self, features_df):
+        """
+        Scales a frame of raw feature rows and returns {target: predictions}.
+        Every row is predicted on its own: gaps are filled with training-time means, never with
+        statistics of the frame, so a row's prediction does not depend on what it is batched with.
+        """
+        missing = [f for f in self.features if f not in features_df.columns]
+        if missing:
+            raise ValueError(f"Missing feature columns: {', '.join(missing)}")
+        features = features_df[self.features].fillna(self.fill_values)
+        X_scaled, _ = DataParse.preprocess_data(features, scaler=self.scaler)
+        return data_modeling.predict(self.models, X_scaled)
+
+    def summary(self):
+        return {
+            "site": self.site_no,
+            "version": self.version,
+            "created_at": self.manifest.get("created_at"),
+            "xgboost_version": self.manifest.get("xgboost_version"),
+            "multi_output": any(m["multi_output"] for m in self.manifest["models"]),
+            "features": self.features,
+            "targets": self.targets,
+            "last_timestamp": self.manifest.get("last_timestamp"),
+            "last_labelled_timestamp": self.manifest.get("last_labelled_timestamp"),
+            "metrics": self.manifest.get("metrics")
+        }
+
+
+def save_site_models(site_no, models, scaler, features, metrics=None, historical_df=None,
+                     models_dir=MODELS_DIR, extra=None):
+    """
+    Saves a training run as a new version and makes it the live one.
+    `models` is the dict returned by data_modeling.train_xgboost_models.
+    `historical_df` (timestamp-indexed) provides the template row and last trained timestamp.
+    Returns the new version string.
+    """
+    version = datetime.utcnow().strftime("%Y%m%dT%H%M%S%fZ")
+    root = site_dir(site_no, models_dir)
+    version_dir = os.path.join(root, version)
+    os.makedirs(version_dir)
+
+    model_entries = []
+    for key, model in models.items():
+        filename = _model_filename(key)
+        model.save_model(os.path.join(version_dir, filename))
+        best_iter = getattr(model, "best_iteration", None)
+        model_entries.append({
+            "targets": list(key) if isinstance(key, tuple) else [key],
+            "multi_output": isinstance(key, tuple),
+            "file": filename,
+            "best_iteration": None if best_iter is None else int(best_iter)
+        })
+    joblib.dump(scaler, os.path.join(version_dir, "scaler.joblib"))
+
+    targets = [t for entry in model_entries for t in entry["targets"]]
+    manifest = {
+        "format_version": REGISTRY_FORMAT_VERSION,
+        "site": site_no,
+        "version": version,
+        "created_at": datetime.utcnow().isoformat(),
+        "xgboost_version": xgboost.__version__,
+        "features": list(features),
+        "targets": targets,
+        "models": model_entries,
+        "metrics": {t: {k: _json_safe(v) for k, v in m.items()} for t, m in (metrics or {}).items()},
+        "last_timestamp": None,
+        "last_labelled_timestamp": None,
+        "template_row": None,
+        "fill_values": training_fill_values(scaler, features)
+    }
+    if historical_df is not None and len(historical_df):
+        if not historical_df.index.is_monotonic_increasing:
+            historical_df = historical_df.sort_index()
+        last_row = historical_df.iloc[-1]
+        manifest["last_timestamp"] = _json_safe(historical_df.index[-1])
+        manifest["template_row"] = {col: _json_safe(last_row[col]) for col in historical_df.columns}
+        if all(t in historical_df.columns for t in targets):
+            labelled = historical_df.index[historical_df[targets].notna().all(axis=1)]
+            if len(labelled):
+                manifest["last_labelled_timestamp"] = _json_safe(labelled.max())
+    if extra:
+        manifest.update(extra)
+
+    with open(os.path.join(version_dir, "manifest.json"), 'w') as f:
+        json.dump(manifest, f, indent=4)
+
+    # Switch the live version atomically, then prune old versions
+    tmp_path = os.path.join(root, "CURRENT.tmp")
+    with open(tmp_path, 'w') as f:
+        f.write(version)
+    os.replace(tmp_path, os.path.join(root, "CURRENT"))
+    _prune_versions(root, version)
+    return version
+
+
+def _prune_versions(root, live_version):
+    versions = sorted(d for d in os.listdir(root) if os.path.isdir(os.path.join(root, d)))
+    old = [v for v in versions if v != live_version]
+    for version in old[:max(0, len(old) - KEEP_VERSIONS)]:
+        shutil.rmtree(os.path.join(root, version), ignore_errors=True)
+
+
+def load_site_models(site_no, models_dir=MODELS_DIR, version=None):
+    """Loads a site's live (or a specific) model version. Raises FileNotFoundError if there is none."""
+    version = version or current_version(site_no, models_dir)
+    if version is None:
+        raise FileNotFoundError(f"No saved models for site {site_no}")
+    version_dir = os.path.join(site_dir(site_no, models_dir), version)
+
+    with open(os.path.join(version_dir, "manifest.json"), 'r') as f:
+        manifest = json.load(f)
+
+    models = {}
+    for entry in manifest["models"]:
+        model = XGBRegressor()
+        model.load_model(os.path.join(version_dir, entry["file"]))
+        key = tuple(entry["targets"]) if entry["multi_output"] else entry["targets"][0]
+        models[key] = model
+    scaler = joblib.load(os.path.join(version_dir, "scaler.joblib"))
+    return SiteModels(site_no, version, manifest, models, scaler)
+
+
+def load_all(site_ids, models_dir=MODELS_DIR):
+    """Loads the live models of every site that has any; sites without models are skipped."""
+    loaded = {}
+    for site_no in site_ids:
+        try:
+            loaded[site_no] = load_site_models(site_no, models_dir)
+        except FileNotFoundError:
+            continue
+    return loaded
@@ -0,0 +1,117 @@
+## Reads and writes the per-site prediction files.
+
+## Next to every predictions_site_N.csv the pipeline writes a columnar bundle:
+##   predictions_site_N.values.npy     float64 matrix, one contiguous column per feature
+##   predictions_site_N.timestamp.npy  datetime64 array, already sorted
+##   predictions_site_N.columns.json   column names and row count (written last)
+## The API memory-maps the bundle instead of parsing the CSV, and falls back to
+## the CSV when no bundle is present.
+
+import os
+import json
+
+import numpy as np
+import pandas as pd
+
+TIME_COLUMNS = ['year', 'month', 'day', 'hour']
+# Version 2 records each column's dtype in columns.json
+BUNDLE_FORMAT_VERSION = 2
+
+
+def bundle_paths(csv_path):
+    """Returns the bundle file paths that belong to a predictions CSV."""
+    base, _ = os.path.splitext(csv_path)
+    return {
+        "values": f"{base}.values.npy",
+        "timestamp": f"{base}.timestamp.npy",
+        "meta": f"{base}.columns.json"
+    }
+
+
+def _atomic_write(path, write):
+    tmp_path = f"{path}.tmp"
+    write(tmp_path)
+    os.replace(tmp_path, path)
+
+
+def _save_npy(path, array):
+    # np.save appends ".npy" to bare names, so hand it an open file instead
+    def write(tmp_path):
+        with open(tmp_path, 'wb') as f:
+            np.save(f, array)
+    _atomic_write(path, write)
+
+
+def write_prediction_bundle(df, csv_path):
+    """Writes the columnar bundle for a predictions frame (sorted by timestamp)."""
+    df = df.drop(columns=['timestamp'], errors='ignore')
+    timestamps = pd.to_datetime(df[TIME_COLUMNS]).to_numpy()
+    order = np.argsort(timestamps, kind='stable')
+
+    columns = list(df.columns)
+    # The CSV stores float32 columns (the model outputs) by their shortest decimal repr and reads them back
+    # as float64; widen them the same way so both files give identical values
+    float32_columns = [col for col in columns if df[col].dtype == np.float32]
+    if float32_columns:
+        df = df.astype({col: str for col in float32_columns}).astype({col: np.float64 for col in float32_columns})
+    # Fortran order keeps every column contiguous on disk, so the frame can wrap it without copying
+    values = np.asfortranarray(df.to_numpy(dtype=np.float64)[order])
+
+    paths = bundle_paths(csv_path)
+    _save_npy(paths["values"], values)
+    _save_npy(paths["timestamp"], timestamps[order])
+
+    # The matrix is all float64; integer columns are cast back on read so the frame matches the CSV's
+    dtypes = {col: "int64" if pd.api.types.is_integer_dtype(df[col]) else "float64" for col in columns}
+    meta = {"version": BUNDLE_FORMAT_VERSION, "columns": columns, "dtypes": dtypes, "rows": int(len(df))}
+
+    def write_meta(tmp_path):
+        with open(tmp_path, 'w') as f:
+            json.dump(meta, f, indent=4)
+    _atomic_write(paths["meta"], write_meta)
+    return paths
+
+
+def read_prediction_bundle(csv_path):
+    """Memory-maps a prediction bundle and returns it as a sorted frame with a `timestamp` column."""
+    paths = bundle_paths(csv_path)
+    with open(paths["meta"], 'r') as f:
+        meta = json.load(f)
+
+    values = np.load(paths["values"], mmap_mode='r')
+    timestamps = np.load(paths["timestamp"], mmap_mode='r')
+    if values.shape != (meta["rows"], len(meta["columns"])) or len(timestamps) != meta["rows"]:
+        raise ValueError(f"Prediction bundle for {csv_path} is incomplete")
+
+    df = pd.DataFrame(values, columns=meta["columns"], copy=False)
+    # Version 1 bundles have no dtypes; their only integer columns are the time columns
+    dtypes = meta.get("dtypes") or {col: "int64" for col in TIME_COLUMNS if col in df.columns}
+    for col, dtype in dtypes.items():
+        if dtype != "float64":
+            df[col] = df[col].astype(dtype)
+    df['timestamp'] = pd.Series(np.asarray(timestamps), copy=False)
+    return df
+
+
+def read_prediction_csv(csv_path):
+    """Parses a predictions CSV and returns it sorted with a `timestamp` column."""
+    df = pd.read_csv(csv_path)
+    df['timestamp'] = pd.to_datetime(df[TIME_COLUMNS])
+    return df.sort_values('timestamp').reset_index(drop=True)
+
+
+def resolve_source(csv_path):
+    """
+    Picks the file to load predictions from.
+    Returns (path, reader): the bundle's meta file when a bundle exists, else the CSV itself.
+    """
+    paths = bundle_paths(csv_path)
+    if all(os.path.exists(p) for p in paths.values()):
+        return paths["meta"], read_prediction_bundle
+    return csv_path, read_prediction_csv
+
+
+def read_predictions(csv_path):
+    """Loads a site's predictions, preferring the columnar bundle over the CSV."""
+    _, reader = resolve_source(csv_path)
+    return reader(csv_path)
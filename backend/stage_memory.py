@@ -0,0 +1,69 @@
+## Per-stage memory accounting for the training pipeline.
+
+import time
+import tracemalloc
+
+
+def _format_mb(n):
+    return f"{n / (1024 * 1024):.1f} MB"
+
+
+class StageMemoryReport:
+    """
+    Records the peak memory of each pipeline stage.
+
+    Call mark(stage) at the end of every stage; the entry covers everything since
+    the previous mark. Numbers come from tracemalloc, which sees numpy and pandas
+    buffers but not memory allocated natively by xgboost. When `enabled` is False
+    every call is a no-op, so the pipeline can always call it.
+    """
+
+    def __init__(self, enabled=True):
+        self.enabled = enabled
+        self.stages = []
+        self._started_tracing = False
+        self._last_mark = None
+
+    def start(self):
+        if not self.enabled:
+            return self
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracing = True
+        tracemalloc.reset_peak()
+        self._last_mark = time.perf_counter()
+        return self
+
+    def mark(self, stage):
+        if not self.enabled or self._last_mark is None:
+            return
+        current, peak = tracemalloc.get_traced_memory()
+        now = time.perf_counter()
+        self.stages.append({
+            "stage": stage,
+            "seconds": now - self._last_mark,
+            "peak_bytes": peak,
+            "held_bytes": current
+        })
+        tracemalloc.reset_peak()
+        self._last_mark = now
+
+    def stop(self):
+        if self._started_tracing:
+            tracemalloc.stop()
+            self._started_tracing = False
+        self._last_mark = None
+
+    @property
+    def peak_bytes(self):
+        return max((s["peak_bytes"] for s in self.stages), default=0)
+
+    def print_report(self, title="Memory by stage"):
+        if not self.stages:
+            return
+        print(f"\n📊 {title} (peak = highest traced allocation during the stage, held = still allocated after it)")
+        width = max(len(s["stage"]) for s in self.stages)
+        for s in self.stages:
+            print(f"   {s['stage'].ljust(width)}  peak {_format_mb(s['peak_bytes']):>10}  "
+                  f"held {_format_mb(s['held_bytes']):>10}  {s['seconds']:7.2f}s")
+        print(f"   {'overall'.ljust(width)}  peak {_format_mb(self.peak_bytes):>10}")
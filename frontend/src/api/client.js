@@ -14,8 +14,20 @@ const apiClient = axios.create({
 export const api = {
   // Site data
   getSites: () => apiClient.get('/api/sites'),
-  getSiteData: (siteId, horizon = 24) => 
-    apiClient.get(`/api/data/site/${siteId}`, { params: { horizon } }),
+  getSiteData: (siteId, horizon = 24, format = 'records') => 
+    apiClient.get(`/api/data/site/${siteId}`, { params: { horizon, format } }),
+  // Page through a site's forecast by time range (end exclusive); the response has total/next_offset
+  getSiteDataRange: (siteId, { start, end, offset = 0, limit = 168, format = 'records' } = {}) =>
+    apiClient.get(`/api/data/site/${siteId}`, { params: { start, end, offset, limit, format } }),
+  // Chart-sized forecast: resolution ('hourly' | '3h' | 'daily', agg 'mean' | 'max') and/or at most `points` rows (LTTB)
+  getSiteChartData: (siteId, horizon = 168, { resolution, agg, points = 500, pollutant = 'O3' } = {}) =>
+    apiClient.get(`/api/data/site/${siteId}`, { params: { horizon, resolution, agg, points, pollutant } }),
+  getSitesData: (siteIds = null, horizon = 24) =>
+    apiClient.get('/api/data/sites', { params: { ids: siteIds ? siteIds.join(',') : undefined, horizon } }),
+  
+  // On-demand forecast from the trained models
+  getOnDemandForecast: (site, hours = 24, start = null) =>
+    apiClient.post('/api/forecast', { site, hours, start }),
   
   // Metrics
   getSiteMetrics: (siteId, pollutant = 'O3') =>
@@ -29,12 +41,16 @@ export const api = {
   // Health recommendations
   getHealthRecommendations: (aqi, profile) =>
     apiClient.post('/api/health-recommendations', { aqi, profile }),
+  getHealthRecommendationsBatch: (items, compact = false) =>
+    apiClient.post('/api/health-recommendations/batch', { items, compact }),
   
   // Feedback
   submitFeedback: (feedback) =>
     apiClient.post('/api/feedback', feedback),
   getFeedback: (site = null, limit = 50) =>
     apiClient.get('/api/feedback', { params: { site, limit } }),
+  getFeedbackSummary: (site = null, windowMinutes = 60) =>
+    apiClient.get('/api/feedback/summary', { params: { site, window_minutes: windowMinutes } }),
   
   // Download
   downloadForecast: (siteId, pollutant, horizon) =>